@@ -1,17 +1,80 @@
-from fastapi import FastAPI, UploadFile, File, Request
+import time
+_module_load_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, Request, Response, Body
+from typing import Any
 from fastapi.middleware.cors import CORSMiddleware
 import os
-import pandas as pd
 import json
+import csv
+import re
 from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
 import tempfile
+import io
 from io import BytesIO
-from docx import Document
-from docx.shared import Pt, Mm
-from docx.enum.table import WD_ROW_HEIGHT_RULE
 import datetime
+import asyncio
+import array
+import enum
+import collections
+import contextlib
+import stat
+import importlib
+import threading
+import hashlib
+import copy
+import mmap
+import shutil
+import struct
+import sys
+import zlib
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# pandas, numpy, python-docx, openpyxl and fpdf2 are imported inside the functions that need them,
+# so /ping, /exam-config and the JSON endpoints never pay for them. They are pre-loaded in a
+# background thread after startup (set FACULTY_DUTY_PREWARM=0 to disable).
+HEAVY_MODULES = ["numpy", "pandas", "openpyxl", "docx", "fpdf"]
+
+startup_metrics = {
+    "module_load_ms": None,
+    "startup_complete_ms": None,
+    "prewarm_ms": None,
+    "first_request_ms": {},
+}
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+_heavy_import_lock = threading.Lock()
+
+def import_heavy_module(name):
+    # Serialised with the pre-warm thread: python-docx's circular imports break if two threads run them at once
+    with _heavy_import_lock:
+        return importlib.import_module(name)
+
+def prewarm_heavy_modules():
+    started = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            import_heavy_module(name)
+        except ImportError as e:
+            print(f"Warning: could not pre-load {name}: {e}")
+    startup_metrics["prewarm_ms"] = elapsed_ms(started)
+    print(f"Pre-loaded report dependencies in {startup_metrics['prewarm_ms']} ms")
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    startup_metrics["startup_complete_ms"] = elapsed_ms(_module_load_started)
+    print(f"Application ready {startup_metrics['startup_complete_ms']} ms after import started")
+    if os.environ.get("FACULTY_DUTY_PREWARM", "1") != "0":
+        threading.Thread(target=prewarm_heavy_modules, name="prewarm-heavy-modules", daemon=True).start()
+    yield
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for all origins (for development)
 app.add_middleware(
@@ -20,17 +83,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Assignment-Violations", "X-Assignment-Seed", "X-Fairness-Score", "X-Assignment-Restarts"],
 )
 
+@app.middleware("http")
+async def record_first_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Only requests that reached a route are recorded; keying 404s by URL would grow the dict without limit
+    route = request.scope.get("route")
+    if route is None or request.method not in (getattr(route, "methods", None) or ()):
+        return response
+    key = f"{request.method} {route.path}"
+    if key not in startup_metrics["first_request_ms"]:
+        startup_metrics["first_request_ms"][key] = elapsed_ms(started)
+    return response
+
 FAKE_FACULTY_PATH = "faculty_upload.csv"
 FACULTY_GROUPS_PATH = "faculty_groups.json"
 FACULTY_UNAVAILABILITY_PATH = "faculty_unavailability.json"
 EXAM_SCHEDULE_PATH = "exam_schedule.json"
 ASSIGNMENTS_PATH = "assignments.json"
 EXAM_CONFIG_PATH = "exam_config.json"
+REPORT_TEMPLATES_PATH = "report_templates.json"
 
 # Advanced Report Generation Functions
-def generate_faculty_summary_excel(df, unavailability=None):
+def generate_faculty_summary_excel(df, unavailability=None, extra_sheets=None):
+    import pandas as pd
     try:
         print(f"Starting Excel generation with df shape: {df.shape}")
         print(f"DataFrame columns: {df.columns.tolist()}")
@@ -192,14 +271,17 @@ def generate_faculty_summary_excel(df, unavailability=None):
         
         output = BytesIO()
         with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            faculty_summary.to_excel(writer, sheet_name="Faculty Duty Summary", index=False)
-            worksheet = writer.sheets["Faculty Duty Summary"]
-            for idx, col in enumerate(faculty_summary.columns):
-                max_length = max(
-                    faculty_summary[col].astype(str).apply(len).max(),
-                    len(col)
-                ) + 2
-                worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
+            sheets = {"Faculty Duty Summary": faculty_summary}
+            sheets.update(extra_sheets or {})
+            for sheet_name, sheet in sheets.items():
+                sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+                worksheet = writer.sheets[sheet_name]
+                for idx, col in enumerate(sheet.columns):
+                    max_length = max(
+                        sheet[col].astype(str).str.len().max() if len(sheet) else 0,
+                        len(col)
+                    ) + 2
+                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)
         output.seek(0)
         print("Excel file generated successfully")
         return output.getvalue()
@@ -210,6 +292,7 @@ def generate_faculty_summary_excel(df, unavailability=None):
         return None
 
 def format_unavail_dates(date_set):
+    import pandas as pd
     formatted = []
     for d in sorted(date_set):
         if isinstance(d, str):
@@ -228,40 +311,17 @@ def format_unavail_dates(date_set):
     return ', '.join(formatted) if formatted else 'None'
 
 def generate_word_doc(df):
+    import pandas as pd
     try:
+        import_heavy_module("docx")
+        from docx.oxml import OxmlElement
+        from docx.table import Table
+        from docx.enum.table import WD_ROW_HEIGHT_RULE
         df = df.copy()
         
-        # Load exam configuration
-        exam_config = {
-            "examType": "MID SEM",
-            "semester": "MO",
-            "year": "2025",
-            "department": "Computer Science & Engineering",
-            "institute": "BIT MESRA, RANCHI"
-        }
-        if os.path.exists(EXAM_CONFIG_PATH):
-            try:
-                with open(EXAM_CONFIG_PATH, "r", encoding="utf-8") as f:
-                    exam_config = json.load(f)
-            except Exception as e:
-                print(f"Error loading exam config: {e}")
-        
-        # Load faculty contact information if available
-        faculty_contacts = {}
-        if os.path.exists(FAKE_FACULTY_PATH):
-            try:
-                faculty_df = pd.read_csv(FAKE_FACULTY_PATH)
-                # Create a mapping of faculty name to contact info
-                for _, row in faculty_df.iterrows():
-                    faculty_name = row.get('faculty') or row.get('Faculty')
-                    if faculty_name:
-                        faculty_contacts[faculty_name] = {
-                            'Phone No': row.get('Phone No', ''),
-                            'Email Id': row.get('Email Id', '') or row.get('Email ID', '') or row.get('email', '')
-                        }
-                print(f"Loaded contact info for {len(faculty_contacts)} faculty")
-            except Exception as e:
-                print(f"Error loading faculty contacts: {e}")
+        # Load exam configuration and faculty contact information
+        exam_config = load_exam_config()
+        faculty_contacts = load_faculty_contacts()
         
         # Normalize column names to handle both lowercase and uppercase
         column_mapping = {}
@@ -294,215 +354,314 @@ def generate_word_doc(df):
             print("Warning: No valid data for Word report generation")
             return None
             
+        # The static parts of the chart come from the department's compiled template
+        layout = get_report_template(exam_config)
+        doc, marker, date_prototype, table_prototype = layout.word_document()
+        doc.paragraphs[0].runs[0].text = f"Date : {datetime.datetime.today().strftime('%d/%m/%Y')}"
+        fields = [column["field"] for column in layout.columns]
+        values = {
+            "faculty": lambda row: str(row["Faculty"]),
+            "phone": lambda row: str(row.get("Phone No", "")),
+            "email": lambda row: str(row.get("Email Id", "")),
+        }
+        data_row, blank_row = table_prototype.tr_lst[1:]
+        
+        # Get unique dates and sort them
+        unique_dates = sorted(df["Date"].unique())
+        for date in unique_dates:
+            if pd.isna(date):
+                continue
+            # Blank paragraph, then the bold date line, then the table, all ahead of the notes
+            marker.addprevious(OxmlElement("w:p"))
+            date_para = copy.deepcopy(date_prototype)
+            set_row_texts(date_para, [f"{date.strftime('%d.%m.%Y')} ({date.strftime('%A')})"])
+            marker.addprevious(date_para)
+            
+            # Filter DataFrame for the current date
+            df_for_date = df[df["Date"] == date].copy()
+            # Sort by shift for correct merging order
+            df_for_date = df_for_date.sort_values(by=["Shift"])
+            groups = []
+            for shift in ("First Half", "Second Half"):
+                rows = [row for _, row in df_for_date[df_for_date["Shift"] == shift].iterrows()]
+                if rows:
+                    groups.append((shift, rows))
+            
+            tbl = copy.deepcopy(table_prototype)
+            for prototype_row in tbl.tr_lst[1:]:
+                tbl.remove(prototype_row)
+            segments = []
+            for index, (shift, rows) in enumerate(groups):
+                if index > 0:
+                    # A single blank row separates the shifts
+                    tbl.append(copy.deepcopy(blank_row))
+                first_row = len(tbl.tr_lst)
+                for serial_no, row in enumerate(rows, 1):
+                    texts = []
+                    for field in fields:
+                        if field == "shift":
+                            texts.append(shift if serial_no == 1 else "")
+                        elif field == "serial":
+                            texts.append(str(serial_no))
+                        else:
+                            texts.append(values[field](row))
+                    new_row = copy.deepcopy(data_row)
+                    set_row_texts(new_row, texts)
+                    tbl.append(new_row)
+                segments.append((shift, first_row, len(tbl.tr_lst) - 1))
+            marker.addprevious(tbl)
+            
+            # Merge the shift column for each shift
+            table = Table(tbl, doc._body)
+            for shift, first_row, last_row in segments:
+                try:
+                    merged_cell = table.cell(first_row, 0).merge(table.cell(last_row, 0))
+                    merged_cell.vertical_alignment = WD_ROW_HEIGHT_RULE.AT_LEAST
+                except Exception as e:
+                    print(f"Error merging {shift} cells: {e}")
+        marker.getparent().remove(marker)
+        
+        buffer = BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        return buffer.getvalue()
+    except Exception as e:
+        print(f"Error generating Word document: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def load_exam_config():
+    exam_config = {
+        "examType": "MID SEM",
+        "semester": "MO",
+        "year": "2025",
+        "department": "Computer Science & Engineering",
+        "institute": "BIT MESRA, RANCHI"
+    }
+    if os.path.exists(EXAM_CONFIG_PATH):
+        try:
+            with open(EXAM_CONFIG_PATH, "r", encoding="utf-8") as f:
+                exam_config = json.load(f)
+        except Exception as e:
+            print(f"Error loading exam config: {e}")
+    return exam_config
+
+def load_faculty_contacts():
+    import pandas as pd
+    # Map faculty name -> {'Phone No', 'Email Id'}
+    faculty_contacts = {}
+    if os.path.exists(FAKE_FACULTY_PATH):
+        try:
+            faculty_df = pd.read_csv(FAKE_FACULTY_PATH)
+            for _, row in faculty_df.iterrows():
+                faculty_name = row.get('faculty') or row.get('Faculty')
+                if faculty_name:
+                    faculty_contacts[faculty_name] = {
+                        'Phone No': row.get('Phone No', ''),
+                        'Email Id': row.get('Email Id', '') or row.get('Email ID', '') or row.get('email', '')
+                    }
+            print(f"Loaded contact info for {len(faculty_contacts)} faculty")
+        except Exception as e:
+            print(f"Error loading faculty contacts: {e}")
+    return faculty_contacts
+
+# Report Templates
+# The text and table layout of the Word and PDF duty charts. report_templates.json maps a department name
+# (or "default") to a template; keys it leaves out fall back to DEFAULT_REPORT_TEMPLATE. Text may use the
+# exam config fields, e.g. {department} or {examType}. A template is compiled once per version of the
+# templates file and exam config: texts are formatted, and the Word skeleton (static paragraphs plus a
+# pre-styled date line and table) is built once and cloned for each render.
+DEFAULT_REPORT_TEMPLATE = {
+    "header": ["Department of {department}", "{institute}"],
+    "title": "Examination Duty Chart - {examType} {semester} {year}",
+    "shift_times": {
+        "MID SEM": {"First Half": ["09:40", "12:00"], "Second Half": ["13:40", "16:00"]},
+        "default": {"First Half": ["09:40", "13:00"], "Second Half": ["13:40", "17:00"]},
+    },
+    "notes": [
+        "All the Invigilators according to the invigilation chart are requested to report to the upstairs examination office 20 minute before the examination starts (The room allotment will be done before the start of each examination).",
+        "If any Invigilator is unable to do invigilation duty for any reason, then it should be brought to the notice of the Controller of Examination with alternative arrangement through HoD well before the start of the examination.",
+        "Invigilators will be prohibited from carrying and using cell phones in the Examination Hall (As recommended in the 66th meeting of the Examination Committee meeting).",
+        "Invigilators should make sure that bags of the students are not kept inside the Examination Hall (As recommended in the 66th meeting of the Examination Committee meeting)."
+    ],
+    "signatory": ["(Dr. A. Mustafi)", "Professor & Head", "Department of Computer Science & Engineering", "B.I.T., Mesra, Ranchi"],
+    "copy_to": [
+        "All faculty members (through email)",
+        "Controller of examination",
+        "Copy to V.C Office",
+        "Office File"
+    ],
+    "columns": [
+        {"field": "shift", "label": "Shift", "width_mm": 25, "align": "center"},
+        {"field": "serial", "label": "S.No", "width_mm": 15.1, "align": "center"},
+        {"field": "faculty", "label": "Faculty", "width_mm": 60, "align": "left"},
+        {"field": "phone", "label": "Phone No", "width_mm": 30, "align": "center"},
+        {"field": "email", "label": "Email ID", "width_mm": 40, "align": "left"},
+    ],
+}
+REPORT_COLUMN_FIELDS = {"shift", "serial", "faculty", "phone", "email"}
+REPORT_SHIFT_NAMES = {"First Half": "1st Half", "Second Half": "2nd Half"}
+REPORT_TABLES_MARKER = "[[duty tables]]"
+
+class TemplateFields(dict):
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+def format_template_text(text, exam_config):
+    try:
+        return str(text).format_map(TemplateFields(exam_config))
+    except (ValueError, IndexError, AttributeError):
+        return str(text)
+
+def parse_shift_time(value):
+    return datetime.datetime.strptime(value, "%H:%M").time()
+
+def chart_time(value):
+    # 13:40 -> "01.40 P.M.", the way the duty chart prints times
+    if value == datetime.time(12, 0):
+        return "12.00 NOON"
+    return f"{value:%I.%M} {'A.M.' if value.hour < 12 else 'P.M.'}"
+
+def validate_shift_times(rules):
+    if not isinstance(rules, dict) or not all(isinstance(times, dict) for times in rules.values()):
+        return ["shift_times must map an exam type to an object of shift timings"]
+    errors = []
+    for exam_type, times in rules.items():
+        if set(times) != set(REPORT_SHIFT_NAMES):
+            errors.append(f"shift_times for '{exam_type}' must give exactly: {', '.join(REPORT_SHIFT_NAMES)}")
+            continue
+        for shift, span in times.items():
+            try:
+                start, end = (parse_shift_time(value) for value in span)
+            except (TypeError, ValueError):
+                errors.append(f"shift_times for '{exam_type}' {shift} must be [start, end] as \"HH:MM\"")
+                continue
+            if start >= end:
+                errors.append(f"shift_times for '{exam_type}' {shift} must end after it starts")
+    return errors
+
+def validate_report_template(template):
+    errors = []
+    if not isinstance(template, dict):
+        return ["template must be an object"]
+    unknown = set(template) - set(DEFAULT_REPORT_TEMPLATE)
+    if unknown:
+        errors.append(f"unknown keys: {', '.join(sorted(unknown))}")
+    for key in ("header", "notes", "signatory", "copy_to"):
+        if key in template and not (isinstance(template[key], list) and all(isinstance(line, str) for line in template[key])):
+            errors.append(f"{key} must be a list of strings")
+    if "title" in template and not isinstance(template["title"], str):
+        errors.append("title must be a string")
+    errors += validate_shift_times(template.get("shift_times", {}))
+    columns = template.get("columns", DEFAULT_REPORT_TEMPLATE["columns"])
+    if not isinstance(columns, list) or not columns or not all(isinstance(column, dict) for column in columns):
+        errors.append("columns must be a non-empty list of objects")
+    else:
+        fields = [column.get("field") for column in columns]
+        if fields[0] != "shift":
+            errors.append("the first column must be the shift column")
+        for column in columns:
+            if column.get("field") not in REPORT_COLUMN_FIELDS:
+                errors.append(f"unknown column field '{column.get('field')}'")
+            if not isinstance(column.get("width_mm", 0), (int, float)) or column.get("width_mm", 1) <= 0:
+                errors.append(f"width_mm of column '{column.get('field')}' must be a positive number")
+            if column.get("align", "center") not in ("left", "center"):
+                errors.append(f"align of column '{column.get('field')}' must be 'left' or 'center'")
+    return errors
+
+def load_report_templates():
+    templates = {}
+    if os.path.exists(REPORT_TEMPLATES_PATH):
+        try:
+            with open(REPORT_TEMPLATES_PATH, "r", encoding="utf-8") as f:
+                templates = json.load(f)
+        except Exception as e:
+            print(f"Error loading report templates: {e}")
+    return templates
+
+def set_row_texts(element, texts):
+    # Fill the w:t elements of a cloned row or paragraph in document order; empty text leaves a bare run
+    from docx.oxml.ns import qn
+    for text_element, text in zip(list(element.iter(qn("w:t"))), texts):
+        if not text:
+            text_element.getparent().remove(text_element)
+            continue
+        text_element.text = text
+        if text != text.strip():
+            text_element.set(qn("xml:space"), "preserve")
+
+class CompiledReportTemplate:
+    __slots__ = ("header", "title", "shift_times", "time_lines", "notes", "signatory", "copy_to", "columns", "_word_skeleton")
+
+    def __init__(self, template, exam_config):
+        text = lambda value: format_template_text(value, exam_config)
+        self.header = [text(line) for line in template["header"]]
+        self.title = text(template["title"])
+        # Shift -> (start, end); the chart's time lines, calendar events and emails all come from these
+        exam_type = exam_config.get("examType", "MID SEM")
+        rules = template["shift_times"]
+        times = rules.get(exam_type) or rules.get("default") or DEFAULT_REPORT_TEMPLATE["shift_times"]["default"]
+        self.shift_times = {shift: tuple(parse_shift_time(value) for value in times[shift]) for shift in REPORT_SHIFT_NAMES}
+        self.time_lines = [f"{chart_time(start)} to {chart_time(end)} ({REPORT_SHIFT_NAMES[shift]})"
+                           for shift, (start, end) in self.shift_times.items()]
+        self.time_lines[0] = "Time: " + self.time_lines[0]
+        self.notes = [text(note) for note in template["notes"]]
+        self.signatory = [text(line) for line in template["signatory"]]
+        self.copy_to = [text(line) for line in template["copy_to"]]
+        self.columns = [{"field": column["field"], "label": text(column.get("label", column["field"])),
+                         "width_mm": column.get("width_mm", 30), "align": column.get("align", "center")}
+                        for column in template["columns"]]
+        self._word_skeleton = None
+
+    def build_word_skeleton(self):
+        from docx import Document
+        from docx.shared import Pt, Mm
         doc = Document()
         # Set narrow margins (0.5 inches = 12.7 mm)
-        sections = doc.sections
-        for section in sections:
+        for section in doc.sections:
             section.top_margin = Mm(12.7)
             section.bottom_margin = Mm(12.7)
             section.left_margin = Mm(12.7)
             section.right_margin = Mm(12.7)
         
-        # Get exam type, semester and year from config
-        exam_type = exam_config.get("examType", "MID SEM")
-        semester = exam_config.get("semester", "MO")
-        year = exam_config.get("year", "2025")
-        department = exam_config.get("department", "Computer Science & Engineering")
-        institute = exam_config.get("institute", "BIT MESRA, RANCHI")
-        
-        # Add current date at top right
-        today_str = datetime.datetime.today().strftime('%d/%m/%Y')
+        # Date at top right, filled in per render
         date_para = doc.add_paragraph()
-        date_run = date_para.add_run(f'Date : {today_str}')
+        date_run = date_para.add_run("Date : ")
         date_para.alignment = 2  # Right align
         date_run.font.name = 'Times New Roman'
         date_run.font.size = Pt(12)
         
-        # Create header with exam type, semester and year
         p = doc.add_paragraph()
-        run1 = p.add_run(f"Department of {department}")
-        run1.font.name = 'Times New Roman'
-        run1.font.size = Pt(12)
-        run1.add_break()
-        run2 = p.add_run(institute)
-        run2.font.name = 'Times New Roman'
-        run2.font.size = Pt(12)
-        p.alignment = 1  # Center align (optional)
+        for i, line in enumerate(self.header):
+            run = p.add_run(line)
+            run.font.name = 'Times New Roman'
+            run.font.size = Pt(12)
+            if i < len(self.header) - 1:
+                run.add_break()
+        p.alignment = 1  # Center align
         
-        header = f"Examination Duty Chart - {exam_type} {semester} {year}"
         p2 = doc.add_paragraph()
-        run_header = p2.add_run(header)
+        run_header = p2.add_run(self.title)
         run_header.font.name = 'Times New Roman'
         run_header.font.size = Pt(14)
-        run_header.bold = True  # Make header bold
-        p2.alignment = 1  # Center align (optional)
-        # Add underline to header
+        run_header.bold = True
         run_header.font.underline = True
+        p2.alignment = 1
         
-        # Add time paragraph based on exam_type
-        if exam_type == "MID SEM":
-            time_text = (
-                "Time: 09.40 A.M. to 12.00 NOON (1st Half)\n"
-                "01.40 P.M. to 04.00 P.M. (2nd Half)"
-            )
-        else:
-            time_text = (
-                "Time: 09.40 A.M. to 01.00 P.M. (1st Half)\n"
-                "01.40 P.M. to 05.00 P.M. (2nd Half)"
-            )
         p3 = doc.add_paragraph()
-        run_time = p3.add_run(time_text)
+        run_time = p3.add_run("\n".join(self.time_lines))
         run_time.font.name = 'Times New Roman'
         run_time.font.size = Pt(12)
-        p3.alignment = 1  # Center align (optional)
+        p3.alignment = 1
         
-        # Get unique dates and sort them
-        unique_dates = sorted(df["Date"].unique())
-        for date in unique_dates:
-            if pd.isna(date):
-                continue
-            # Add date display before the table as bold paragraph
-            doc.add_paragraph()  # Add some space before the date display
-            date_para = doc.add_paragraph()
-            day_str = date.strftime('%A')
-            date_str = date.strftime('%d.%m.%Y')
-            date_run = date_para.add_run(f"{date_str} ({day_str})")
-            date_run.bold = True
-            date_run.font.name = 'Times New Roman'
-            date_run.font.size = Pt(12)
-            
-            # Filter DataFrame for the current date
-            df_for_date = df[df["Date"] == date].copy()
-            # Sort by shift for correct merging order
-            df_for_date = df_for_date.sort_values(by=["Shift"])
-            
-            # Calculate total rows needed including blank row between shifts
-            total_rows = len(df_for_date) + 1  # +1 for header
-            if "First Half" in df_for_date["Shift"].values and "Second Half" in df_for_date["Shift"].values:
-                total_rows += 1  # Add one more row for blank row between shifts
-            
-            # Create table with calculated rows
-            table = doc.add_table(rows=total_rows, cols=5)
-            table.style = "Table Grid"
-            
-            # Set column widths (in mm)
-            table.columns[0].width = Mm(25)  # Shift column
-            table.columns[1].width = Mm(15.1)  # S.No column (1.51 cm = 15.1 mm)
-            table.columns[2].width = Mm(60)  # Faculty column
-            table.columns[4].width = Mm(40)  # Email ID column
-            table.columns[3].width = Mm(30)  # Phone No column
-            table.columns[4].width = Mm(40)  # Email ID column
-            
-            # Add header row
-            hdr_cells = table.rows[0].cells
-            headers = ["Shift", "S.No", "Faculty", "Phone No", "Email ID"]
-            for i, header in enumerate(headers):
-                cell = hdr_cells[i]
-                cell.text = header
-                # Set all header cells center aligned
-                cell.paragraphs[0].alignment = 1  # Center align
-                # Make text bold
-                for run in cell.paragraphs[0].runs:
-                    run.bold = True
-                    run.font.name = 'Times New Roman'
-                    run.font.size = Pt(12)
-            
-            # Add data rows for this date
-            current_row = 1  # Start from row 1 (after header)
-            serial_no = 1  # Reset serial number for each date's table
-            first_half_rows = []
-            second_half_rows = []
-            
-            # Collect rows for each shift
-            for idx, row in df_for_date.iterrows():
-                if row["Shift"] == "First Half":
-                    first_half_rows.append(row)
-                elif row["Shift"] == "Second Half":
-                    second_half_rows.append(row)
-            
-            # Write First Half rows
-            for i, row in enumerate(first_half_rows):
-                while current_row >= len(table.rows):
-                    table.add_row()
-                row_cells = table.rows[current_row].cells
-                row_cells[0].text = str(row["Shift"]) if i == 0 else ""
-                row_cells[1].text = str(serial_no)
-                row_cells[2].text = str(row["Faculty"])
-                row_cells[3].text = str(row.get("Phone No", ""))
-                row_cells[4].text = str(row.get("Email Id", ""))
-                for j, cell in enumerate(row_cells):
-                    if j in [2, 4]:
-                        cell.paragraphs[0].alignment = 0  # Left align
-                    else:
-                        cell.paragraphs[0].alignment = 1  # Center align
-                    for run in cell.paragraphs[0].runs:
-                        run.font.name = 'Times New Roman'
-                        run.font.size = Pt(11)
-                serial_no += 1
-                current_row += 1
-            first_half_end_row = current_row - 1 if first_half_rows else None
-            
-            # Add a single blank row if both shifts exist
-            if first_half_rows and second_half_rows:
-                while current_row >= len(table.rows):
-                    table.add_row()
-                blank_cells = table.rows[current_row].cells
-                for cell in blank_cells:
-                    cell.text = ""
-                current_row += 1
-            
-            # Write Second Half rows
-            serial_no = 1
-            second_half_start_row = current_row
-            for i, row in enumerate(second_half_rows):
-                while current_row >= len(table.rows):
-                    table.add_row()
-                row_cells = table.rows[current_row].cells
-                row_cells[0].text = str(row["Shift"]) if i == 0 else ""
-                row_cells[1].text = str(serial_no)
-                row_cells[2].text = str(row["Faculty"])
-                row_cells[3].text = str(row.get("Phone No", ""))
-                row_cells[4].text = str(row.get("Email Id", ""))
-                for j, cell in enumerate(row_cells):
-                    if j in [2, 4]:
-                        cell.paragraphs[0].alignment = 0  # Left align
-                    else:
-                        cell.paragraphs[0].alignment = 1  # Center align
-                    for run in cell.paragraphs[0].runs:
-                        run.font.name = 'Times New Roman'
-                        run.font.size = Pt(11)
-                serial_no += 1
-                current_row += 1
-            
-            # Merge cells for First Half
-            if first_half_rows:
-                try:
-                    merged_cell = table.cell(1, 0).merge(table.cell(first_half_end_row, 0))
-                    merged_cell.vertical_alignment = WD_ROW_HEIGHT_RULE.AT_LEAST
-                except Exception as e:
-                    print(f"Error merging First Half cells: {e}")
-            
-            # Merge cells for Second Half
-            if second_half_rows:
-                try:
-                    merged_cell = table.cell(second_half_start_row, 0).merge(table.cell(current_row - 1, 0))
-                    merged_cell.vertical_alignment = WD_ROW_HEIGHT_RULE.AT_LEAST
-                except Exception as e:
-                    print(f"Error merging Second Half cells: {e}")
+        # Per-date tables are inserted in front of this paragraph
+        doc.add_paragraph(REPORT_TABLES_MARKER)
         
-        # Add a note section at the end
         doc.add_paragraph()
         doc.add_heading("Note:", level=1)
-        notes = [
-            "All the Invigilators according to the invigilation chart are requested to report to the upstairs examination office 20 minute before the examination starts (The room allotment will be done before the start of each examination).",
-            "If any Invigilator is unable to do invigilation duty for any reason, then it should be brought to the notice of the Controller of Examination with alternative arrangement through HoD well before the start of the examination.",
-            "Invigilators will be prohibited from carrying and using cell phones in the Examination Hall (As recommended in the 66th meeting of the Examination Committee meeting).",
-            "Invigilators should make sure that bags of the students are not kept inside the Examination Hall (As recommended in the 66th meeting of the Examination Committee meeting)."
-        ]
-        for i, note in enumerate(notes, 1):
+        for i, note in enumerate(self.notes, 1):
             p = doc.add_paragraph()
-            p.paragraph_format.left_indent = Pt(0)
-            p.paragraph_format.first_line_indent = Pt(0)
             p.paragraph_format.tab_stops.add_tab_stop(Pt(36))  # Hanging indent at 0.5 inch
             run = p.add_run(f"{i}.\t")
             run.bold = True
@@ -511,75 +670,2194 @@ def generate_word_doc(df):
             run2 = p.add_run(note)
             run2.font.name = 'Times New Roman'
             run2.font.size = Pt(12)
-            # Hanging indent effect
             p.paragraph_format.first_line_indent = -Pt(18)
             p.paragraph_format.left_indent = Pt(36)
         
-        # Add signature section
         doc.add_paragraph("\n\n")
         signature = doc.add_paragraph()
-        signature.add_run("(Dr. A. Mustafi)\n").bold = True
-        signature.add_run("Professor & Head\n")
-        signature.add_run("Department of Computer Science & Engineering\n")
-        signature.add_run("B.I.T., Mesra, Ranchi")
+        for i, line in enumerate(self.signatory):
+            run = signature.add_run(line + ("\n" if i < len(self.signatory) - 1 else ""))
+            if i == 0:
+                run.bold = True
         
-        # Add copy to section
         doc.add_paragraph("\n")
-        copy_to = [
-            "All faculty members (through email)",
-            "Controller of examination", 
-            "Copy to V.C Office",
-            "Office File"
-        ]
         p_heading = doc.add_paragraph()
         p_heading.add_run("Copy to:").bold = True
         p_recipients = doc.add_paragraph()
-        for i, recipient in enumerate(copy_to, 1):
+        for i, recipient in enumerate(self.copy_to, 1):
             run = p_recipients.add_run(f"{i}.\t{recipient}")
-            if i < len(copy_to):
-                run.add_break() # Add a line break instead of a new paragraph
+            if i < len(self.copy_to):
+                run.add_break()
         
+        # Prototypes cloned per date: the bold date line and a table with a header, a styled data row and a blank row
+        date_line = doc.add_paragraph()
+        date_line_run = date_line.add_run("-")
+        date_line_run.bold = True
+        date_line_run.font.name = 'Times New Roman'
+        date_line_run.font.size = Pt(12)
+        table = doc.add_table(rows=3, cols=len(self.columns))
+        table.style = "Table Grid"
+        for i, column in enumerate(self.columns):
+            table.columns[i].width = Mm(column["width_mm"])
+            for row, text, bold, size in ((0, column["label"], True, 12), (1, "-", False, 11)):
+                cell = table.cell(row, i)
+                cell.text = text
+                cell.paragraphs[0].alignment = 0 if row and column["align"] == "left" else 1
+                for run in cell.paragraphs[0].runs:
+                    run.bold = bold or None
+                    run.font.name = 'Times New Roman'
+                    run.font.size = Pt(size)
+            table.cell(2, i).text = ""
         buffer = BytesIO()
         doc.save(buffer)
-        buffer.seek(0)
         return buffer.getvalue()
+
+    def word_document(self):
+        # -> (document, marker paragraph element, date line prototype, table prototype)
+        from docx import Document
+        if self._word_skeleton is None:
+            self._word_skeleton = self.build_word_skeleton()
+        doc = Document(BytesIO(self._word_skeleton))
+        body = doc.element.body
+        table_prototype = body.tbl_lst[-1]
+        date_prototype = table_prototype.getprevious()
+        body.remove(table_prototype)
+        body.remove(date_prototype)
+        marker = next(p._p for p in doc.paragraphs if p.text == REPORT_TABLES_MARKER)
+        return doc, marker, date_prototype, table_prototype
+
+_report_template_cache = None  # (templates file signature, exam config, CompiledReportTemplate)
+
+def get_report_template(exam_config):
+    global _report_template_cache
+    signature = file_signature(REPORT_TEMPLATES_PATH)
+    config_key = json.dumps(exam_config, sort_keys=True)
+    cached = _report_template_cache
+    if cached and cached[0] == signature and cached[1] == config_key:
+        return cached[2]
+    templates = load_report_templates()
+    department = exam_config.get("department", "")
+    template = dict(DEFAULT_REPORT_TEMPLATE)
+    template.update(templates.get("default", {}))
+    template.update(templates.get(department, {}))
+    compiled = CompiledReportTemplate(template, exam_config)
+    _report_template_cache = (signature, config_key, compiled)
+    return compiled
+
+def pdf_text(value):
+    # The core Times fonts only cover Latin-1
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+def pdf_wrap(pdf, text, width):
+    # Greedy word wrap with the current font; words wider than the cell are split by character
+    if pdf.get_string_width(text) <= width:
+        return [text]
+    lines, current = [], ""
+    for word in text.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if pdf.get_string_width(candidate) <= width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        current = ""
+        for char in word:
+            if current and pdf.get_string_width(current + char) > width:
+                lines.append(current)
+                current = ""
+            current += char
+    lines.append(current)
+    return lines
+
+def draw_pdf_duty_table(pdf, col_widths, headings, groups, aligns, line_height=5, padding=1):
+    # Lays out one date's table directly with cell/rect calls; the shift column is merged per page segment
+    left = pdf.l_margin
+    lefts = [left + sum(col_widths[:i]) for i in range(len(col_widths))]
+
+    def draw_cells(y, height, texts, start_col):
+        for col in range(start_col, len(col_widths)):
+            pdf.rect(lefts[col], y, col_widths[col], height)
+            for k, text in enumerate(texts[col - start_col]):
+                pdf.set_xy(lefts[col] + padding, y + padding + k * line_height)
+                pdf.cell(col_widths[col] - 2 * padding, line_height, text, align=aligns[col])
+
+    def draw_header():
+        pdf.set_font("Times", style="B", size=12)
+        y = pdf.get_y()
+        height = line_height + 2 * padding
+        for col, text in enumerate(headings):
+            pdf.rect(lefts[col], y, col_widths[col], height)
+            pdf.set_xy(lefts[col], y + padding)
+            pdf.cell(col_widths[col], line_height, text, align="C")
+        pdf.set_y(y + height)
+        pdf.set_font("Times", size=11)
+
+    def close_segment(label, top):
+        bottom = pdf.get_y()
+        pdf.rect(left, top, col_widths[0], bottom - top)
+        pdf.set_xy(left + padding, top + padding)
+        pdf.cell(col_widths[0] - 2 * padding, line_height, label, align="C")
+        pdf.set_y(bottom)
+
+    auto_page_break = pdf.auto_page_break
+    pdf.set_auto_page_break(False, margin=pdf.b_margin)
+    if pdf.get_y() + 2 * (line_height + 2 * padding) > pdf.page_break_trigger:
+        pdf.add_page()
+    draw_header()
+    for index, (label, rows) in enumerate(groups):
+        if index > 0:
+            y = pdf.get_y()
+            height = line_height + 2 * padding
+            if y + height > pdf.page_break_trigger:
+                pdf.add_page()
+                draw_header()
+                y = pdf.get_y()
+            draw_cells(y, height, [[""]] * len(col_widths), 0)
+            pdf.set_y(y + height)
+        top = pdf.get_y()
+        for row in rows:
+            wrapped = [pdf_wrap(pdf, text, col_widths[col + 1] - 2 * padding) for col, text in enumerate(row)]
+            height = max(len(lines) for lines in wrapped) * line_height + 2 * padding
+            if pdf.get_y() + height > pdf.page_break_trigger:
+                close_segment(label, top)
+                pdf.add_page()
+                draw_header()
+                top = pdf.get_y()
+            y = pdf.get_y()
+            draw_cells(y, height, wrapped, 1)
+            pdf.set_y(y + height)
+        close_segment(label, top)
+    pdf.set_x(left)
+    pdf.set_auto_page_break(auto_page_break, margin=pdf.b_margin)
+
+def generate_pdf_report(df):
+    try:
+        import pandas as pd
+        from fpdf import FPDF
+
+        exam_config = load_exam_config()
+        faculty_contacts = load_faculty_contacts()
+
+        df = df.rename(columns={col: col.capitalize() for col in df.columns if col.lower() in ('date', 'shift', 'faculty')})
+        df = df.copy()
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
+        df = df[df["Date"].notna()]
+        if df.empty:
+            print("Warning: No valid data for PDF report generation")
+            return None
+
+        layout = get_report_template(exam_config)
+
+        # Same page geometry as the Word chart: A4 with 12.7 mm margins, Times New Roman
+        pdf = FPDF(orientation="P", unit="mm", format="A4")
+        pdf.set_margins(12.7, 12.7, 12.7)
+        pdf.set_auto_page_break(True, margin=12.7)
+        pdf.add_page()
+        line = 5.5
+
+        pdf.set_font("Times", size=12)
+        pdf.cell(0, line, pdf_text(f"Date : {datetime.datetime.today().strftime('%d/%m/%Y')}"), align="R", new_x="LMARGIN", new_y="NEXT")
+        for header_line in layout.header:
+            pdf.cell(0, line, pdf_text(header_line), align="C", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+        pdf.set_font("Times", style="BU", size=14)
+        pdf.cell(0, 7, pdf_text(layout.title), align="C", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+        pdf.set_font("Times", size=12)
+        for time_line in layout.time_lines:
+            pdf.cell(0, line, pdf_text(time_line), align="C", new_x="LMARGIN", new_y="NEXT")
+
+        col_widths = [column["width_mm"] for column in layout.columns]
+        headings = [pdf_text(column["label"]) for column in layout.columns]
+        aligns = ["L" if column["align"] == "left" else "C" for column in layout.columns]
+        fields = [column["field"] for column in layout.columns[1:]]  # the first column is the merged shift
+        for date, df_for_date in df.groupby("Date", sort=True):
+            pdf.ln(line)
+            pdf.set_font("Times", style="B", size=12)
+            pdf.cell(0, line, f"{date.strftime('%d.%m.%Y')} ({date.strftime('%A')})", new_x="LMARGIN", new_y="NEXT")
+            df_for_date = df_for_date.sort_values(by=["Shift"])
+            groups = []
+            for shift in ("First Half", "Second Half"):
+                rows = []
+                for serial_no, faculty in enumerate(df_for_date.loc[df_for_date["Shift"] == shift, "Faculty"], 1):
+                    contact = faculty_contacts.get(faculty, {})
+                    values = {"serial": str(serial_no), "faculty": faculty,
+                              "phone": contact.get('Phone No', ''), "email": contact.get('Email Id', '')}
+                    rows.append(tuple(pdf_text(values[field]) for field in fields))
+                if rows:
+                    groups.append((shift, rows))
+            draw_pdf_duty_table(pdf, col_widths, headings, groups, aligns)
+
+        pdf.ln(line)
+        pdf.set_font("Times", style="B", size=14)
+        pdf.cell(0, 8, "Note:", new_x="LMARGIN", new_y="NEXT")
+        indent = 12.7  # hanging indent, matching the 36pt tab stop in the Word chart
+        for i, note in enumerate(layout.notes, 1):
+            pdf.set_font("Times", style="B", size=12)
+            pdf.cell(indent, line, f"{i}.")
+            pdf.set_font("Times", size=12)
+            pdf.multi_cell(0, line, pdf_text(note), new_x="LMARGIN", new_y="NEXT")
+
+        pdf.ln(line * 3)
+        for i, signature_line in enumerate(layout.signatory):
+            pdf.set_font("Times", style="B" if i == 0 else "", size=12)
+            pdf.cell(0, line, pdf_text(signature_line), new_x="LMARGIN", new_y="NEXT")
+
+        pdf.ln(line * 2)
+        pdf.set_font("Times", style="B", size=12)
+        pdf.cell(0, line, "Copy to:", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Times", size=12)
+        for i, recipient in enumerate(layout.copy_to, 1):
+            pdf.cell(indent, line, f"{i}.")
+            pdf.cell(0, line, pdf_text(recipient), new_x="LMARGIN", new_y="NEXT")
+
+        return bytes(pdf.output())
     except Exception as e:
-        print(f"Error generating Word document: {str(e)}")
+        print(f"Error generating PDF document: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+# Analytics Workbook
+# The summary sheet plus load, coverage and unavailability aggregates. Every aggregate is a groupby or
+# crosstab over the assignment frame, so the extra sheets add little to the cost of the summary itself.
+def unavailability_frame(unavailability):
+    import pandas as pd
+    rows = [
+        (faculty, label, date)
+        for faculty, shifts in (unavailability or {}).items()
+        for label, key in SHIFT_KEYS.items()
+        for date in (shifts or {}).get(key, [])
+    ]
+    frame = pd.DataFrame(rows, columns=["faculty", "shift", "date"])
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce")
+    return frame.dropna(subset=["date"]).drop_duplicates()
+
+def schedule_frame(schedule):
+    import pandas as pd
+    frame = pd.DataFrame(schedule or [], columns=["date", *SHIFT_KEYS.values()])
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce")
+    frame = frame.dropna(subset=["date"])
+    required = frame.melt(id_vars="date", value_vars=list(SHIFT_KEYS.values()), var_name="shift", value_name="required")
+    required["shift"] = required["shift"].map({key: label for label, key in SHIFT_KEYS.items()})
+    required["required"] = pd.to_numeric(required["required"], errors="coerce").fillna(0).astype(int)
+    return required.groupby(["date", "shift"], as_index=False)["required"].sum()
+
+def build_load_sheets(df, faculty_caps):
+    import pandas as pd
+    counts = pd.crosstab(df["faculty"], df["shift"]).reindex(columns=SHIFT_LABELS, fill_value=0)
+    # Faculty without duties still count towards the distribution
+    roster = pd.Index(list(faculty_caps), name="faculty").union(counts.index)
+    counts = counts.reindex(roster, fill_value=0)
+    load = pd.DataFrame({
+        "Faculty": roster,
+        "First Half Duties": counts["First Half"].to_numpy(),
+        "Second Half Duties": counts["Second Half"].to_numpy(),
+    })
+    load["Total Duties"] = load["First Half Duties"] + load["Second Half Duties"]
+    caps = pd.to_numeric(pd.Series(roster.map(faculty_caps), dtype="object"), errors="coerce")
+    load["Max Duties"] = caps.astype("Int64").to_numpy()
+    load["Load %"] = (load["Total Duties"] / caps.where(caps > 0) * 100).round(1).to_numpy()
+    load["Deviation from Mean"] = (load["Total Duties"] - load["Total Duties"].mean()).round(2)
+    load = load.sort_values(["Total Duties", "Faculty"], ascending=[False, True], ignore_index=True)
+    # Compared row by row on the sorted sheet, so each faculty is checked against their own cap
+    over_cap = int((load["Total Duties"] > load["Max Duties"]).fillna(False).sum())
+
+    totals = load["Total Duties"]
+    histogram = totals.value_counts().sort_index().rename_axis("Duties").reset_index(name="Faculty")
+    histogram["Share %"] = (histogram["Faculty"] / max(len(load), 1) * 100).round(1)
+    histogram["Cumulative %"] = histogram["Share %"].cumsum().round(1)
+    statistics = pd.DataFrame({
+        "Statistic": ["Faculty", "Total duties", "Mean", "Median", "Std deviation", "Min", "Max",
+                      "Faculty without duties", "Faculty over Max Duties"],
+        "Value": [
+            len(load), int(totals.sum()),
+            round(float(totals.mean()), 2) if len(load) else 0,
+            float(totals.median()) if len(load) else 0,
+            round(float(totals.std(ddof=0)), 2) if len(load) else 0,
+            int(totals.min()) if len(load) else 0,
+            int(totals.max()) if len(load) else 0,
+            int((totals == 0).sum()),
+            over_cap,
+        ],
+    })
+    return load, histogram, statistics
+
+def build_coverage_sheets(df, required, unavailable, faculty_count):
+    import pandas as pd
+    assigned = df.groupby(["date", "shift"]).size().rename("assigned")
+    blocked = unavailable.groupby(["date", "shift"])["faculty"].nunique().rename("unavailable")
+    slots = pd.concat([required.set_index(["date", "shift"])["required"], assigned, blocked], axis=1)
+    slots = slots.fillna(0).astype(int).sort_index().reset_index()
+
+    # Days that only carry unavailability belong in the impact sheet, not the coverage sheet
+    scheduled = slots[(slots["required"] > 0) | (slots["assigned"] > 0)]
+    coverage = scheduled.pivot_table(index="date", columns="shift", values=["required", "assigned"], fill_value=0)
+    coverage = coverage.reindex(columns=pd.MultiIndex.from_product([["required", "assigned"], SHIFT_LABELS]), fill_value=0)
+    daily = pd.DataFrame({"Date": coverage.index.strftime("%d-%m-%Y")})
+    for label in SHIFT_LABELS:
+        req = coverage[("required", label)].to_numpy()
+        got = coverage[("assigned", label)].to_numpy()
+        daily[f"{label} Required"] = req
+        daily[f"{label} Assigned"] = got
+        daily[f"{label} Gap"] = got - req
+    total_required = coverage["required"].sum(axis=1).to_numpy()
+    total_assigned = coverage["assigned"].sum(axis=1).to_numpy()
+    daily["Coverage %"] = pd.Series(total_assigned * 100 / total_required.clip(min=1)).where(total_required > 0).round(1)
+
+    impact = pd.DataFrame({
+        "Date": slots["date"].dt.strftime("%d-%m-%Y"),
+        "Shift": slots["shift"],
+        "Required": slots["required"],
+        "Assigned": slots["assigned"],
+        "Unavailable Faculty": slots["unavailable"],
+    })
+    impact["Available Faculty"] = (faculty_count - impact["Unavailable Faculty"]).clip(lower=0)
+    impact["Spare Capacity"] = impact["Available Faculty"] - impact["Required"]
+    impact["Unavailable %"] = (impact["Unavailable Faculty"] / max(faculty_count, 1) * 100).round(1)
+    return daily, impact
+
+def generate_analytics_excel(df, unavailability=None, schedule=None):
+    import pandas as pd
+    try:
+        faculty_caps = load_faculty_caps()
+        assignments = pd.DataFrame({
+            "date": pd.to_datetime(df["date"], errors="coerce"),
+            "shift": df["shift"],
+            "faculty": df["faculty"],
+        }).dropna(subset=["date"])
+        load, histogram, statistics = build_load_sheets(assignments, faculty_caps)
+        daily, impact = build_coverage_sheets(
+            assignments, schedule_frame(schedule), unavailability_frame(unavailability), len(load))
+        extra_sheets = {
+            "Load Distribution": load,
+            "Duty Histogram": histogram,
+            "Load Statistics": statistics,
+            "Daily Coverage": daily,
+            "Unavailability Impact": impact,
+        }
+        return generate_faculty_summary_excel(df, unavailability, extra_sheets)
+    except Exception as e:
+        print(f"Error generating analytics workbook: {str(e)}")
         import traceback
         traceback.print_exc()
         return None
 
+# Compact Assignment Model
+SHIFT_LABELS = ["First Half", "Second Half"]
+SHIFT_KEYS = {"First Half": "first_half", "Second Half": "second_half"}
+UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+class Shift(enum.IntEnum):
+    FIRST_HALF = 0
+    SECOND_HALF = 1
+
+def parse_date_ordinal(value):
+    # ISO date (or datetime) -> proleptic ordinal, 0 when it cannot be parsed
+    if isinstance(value, datetime.datetime):
+        return value.date().toordinal()
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    try:
+        return datetime.date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return 0
+
+class AssignmentRecord:
+    # Lightweight view of one row of an AssignmentTable
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def faculty_id(self):
+        return self.table.faculty_ids[self.index]
+
+    @property
+    def date_ordinal(self):
+        return self.table.date_ordinals[self.index]
+
+    @property
+    def shift_code(self):
+        return self.table.shift_codes[self.index]
+
+    @property
+    def faculty(self):
+        return self.table.faculty_names[self.faculty_id]
+
+    @property
+    def date(self):
+        return self.table.date_label(self.index)
+
+    @property
+    def shift(self):
+        return self.table.shift_labels[self.shift_code]
+
+    def to_dict(self):
+        return {"date": self.date, "shift": self.shift, "faculty": self.faculty}
+
+    def __repr__(self):
+        return f"AssignmentRecord({self.date!r}, {self.shift!r}, {self.faculty!r})"
+
+class AssignmentTable:
+    # Columnar assignments: interned faculty ids, date ordinals and shift codes in typed arrays
+    __slots__ = ("faculty_names", "faculty_index", "shift_labels", "shift_index",
+                 "faculty_ids", "date_ordinals", "shift_codes", "raw_dates")
+
+    def __init__(self):
+        self.faculty_names = []
+        self.faculty_index = {}
+        self.shift_labels = list(SHIFT_LABELS)
+        self.shift_index = {label: code for code, label in enumerate(SHIFT_LABELS)}
+        self.faculty_ids = array.array("I")
+        self.date_ordinals = array.array("i")
+        self.shift_codes = array.array("B")
+        self.raw_dates = {}  # row -> original value for dates that could not be parsed
+
+    @classmethod
+    def from_records(cls, records):
+        table = cls()
+        for item in records:
+            table.append(
+                item.get("date") or item.get("Date") or "",
+                item.get("shift") or item.get("Shift") or "",
+                item.get("faculty") or item.get("Faculty") or ""
+            )
+        return table
+
+    def intern_faculty(self, name):
+        faculty_id = self.faculty_index.get(name)
+        if faculty_id is None:
+            faculty_id = len(self.faculty_names)
+            self.faculty_names.append(name)
+            self.faculty_index[name] = faculty_id
+        return faculty_id
+
+    def intern_shift(self, label):
+        code = self.shift_index.get(label)
+        if code is None:
+            code = len(self.shift_labels)
+            self.shift_labels.append(label)
+            self.shift_index[label] = code
+        return code
+
+    def append(self, date, shift, faculty):
+        ordinal = parse_date_ordinal(date)
+        if ordinal == 0:
+            self.raw_dates[len(self.date_ordinals)] = str(date)
+        self.faculty_ids.append(self.intern_faculty(faculty))
+        self.date_ordinals.append(ordinal)
+        self.shift_codes.append(self.intern_shift(shift))
+
+    def __len__(self):
+        return len(self.date_ordinals)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return AssignmentRecord(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield AssignmentRecord(self, index)
+
+    def date_label(self, index):
+        ordinal = self.date_ordinals[index]
+        if ordinal == 0:
+            return self.raw_dates.get(index, "")
+        return datetime.date.fromordinal(ordinal).isoformat()
+
+    def duty_counts(self):
+        # faculty id -> number of duties
+        counts = [0] * len(self.faculty_names)
+        for faculty_id in self.faculty_ids:
+            counts[faculty_id] += 1
+        return counts
+
+    def to_records(self):
+        return [record.to_dict() for record in self]
+
+    def to_json(self):
+        # Same text as json.dumps(self.to_records(), ensure_ascii=False), encoding each distinct value once
+        encode = lambda value: json.dumps(value, ensure_ascii=False)
+        names = [encode(name) for name in self.faculty_names]
+        labels = [encode(label) for label in self.shift_labels]
+        dates = {}
+        rows = []
+        for index, (faculty_id, ordinal, shift) in enumerate(zip(self.faculty_ids, self.date_ordinals, self.shift_codes)):
+            if ordinal:
+                date = dates.get(ordinal)
+                if date is None:
+                    date = dates[ordinal] = encode(datetime.date.fromordinal(ordinal).isoformat())
+            else:
+                date = encode(self.raw_dates.get(index, ""))
+            rows.append(f'{{"date": {date}, "shift": {labels[shift]}, "faculty": {names[faculty_id]}}}')
+        return "[" + ", ".join(rows) + "]"
+
+    def to_dataframe(self):
+        # Dates come out as datetime64 straight from the ordinals, so reports never re-parse strings
+        import numpy as np
+        import pandas as pd
+        ordinals = np.frombuffer(self.date_ordinals, dtype=np.int32).astype("int64") if len(self) else np.zeros(0, dtype="int64")
+        days = np.where(ordinals > 0, ordinals - UNIX_EPOCH_ORDINAL, np.iinfo("int64").min)
+        dates = days.astype("datetime64[D]").astype("datetime64[ns]")
+        names = np.array(self.faculty_names, dtype=object)
+        labels = np.array(self.shift_labels, dtype=object)
+        return pd.DataFrame({
+            "date": dates,
+            "shift": labels[np.frombuffer(self.shift_codes, dtype=np.uint8)] if len(self) else labels[:0],
+            "faculty": names[np.frombuffer(self.faculty_ids, dtype=np.uint32)] if len(self) else names[:0],
+        })
+
+_assignment_table_cache = None  # (file signature, AssignmentTable)
+
+def cache_assignment_table(table, signature=None):
+    global _assignment_table_cache
+    _assignment_table_cache = (signature or file_signature(ASSIGNMENTS_PATH), table)
+
+def get_assignment_table():
+    # Built once per change to assignments.json and shared by the validators and report generators;
+    # the file signature check also picks up writes made by other workers
+    signature = file_signature(ASSIGNMENTS_PATH)
+    if signature is None:
+        return AssignmentTable()
+    cached = _assignment_table_cache
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(ASSIGNMENTS_PATH, "r", encoding="utf-8") as f:
+        table = AssignmentTable.from_records(json.load(f))
+    cache_assignment_table(table, signature)
+    return table
+
+# Faculty Name Resolution
+# Names are joined across faculty_upload.csv, uploaded sheets and assignments. Each distinct name is resolved
+# once against an index of the faculty list: exact, then normalized (case, punctuation, titles), then trigram similarity.
+NAME_TITLES = {"dr", "mr", "mrs", "ms", "miss", "prof", "professor", "shri", "sri", "smt"}
+FUZZY_MATCH_THRESHOLD = 0.72  # minimum trigram Dice similarity for an approximate match
+FUZZY_MATCH_MARGIN = 0.08  # best candidate must beat the runner-up by this much
+
+NameMatch = collections.namedtuple("NameMatch", ["name", "status", "score", "candidates"])
+
+def normalize_faculty_name(name):
+    tokens = re.findall(r"[a-z0-9]+", str(name).lower())
+    return " ".join(token for token in tokens if token not in NAME_TITLES)
+
+def name_trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class FacultyNameIndex:
+    __slots__ = ("names", "exact", "by_key", "postings", "gram_counts", "memo")
+
+    def __init__(self, names):
+        self.names = []
+        self.exact = {}
+        self.by_key = {}  # normalized name -> canonical ids
+        self.postings = collections.defaultdict(list)  # trigram -> canonical ids
+        self.gram_counts = []
+        self.memo = {}
+        for name in names:
+            if name in self.exact:
+                continue
+            name_id = len(self.names)
+            self.names.append(name)
+            self.exact[name] = name_id
+            key = normalize_faculty_name(name)
+            self.by_key.setdefault(key, []).append(name_id)
+            grams = name_trigrams(key)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(name_id)
+
+    def __len__(self):
+        return len(self.names)
+
+    def resolve(self, raw):
+        match = self.memo.get(raw)
+        if match is None:
+            match = self._resolve(raw)
+            self.memo[raw] = match
+        return match
+
+    def _resolve(self, raw):
+        if raw in self.exact:
+            return NameMatch(raw, "exact", 1.0, [raw])
+        key = normalize_faculty_name(raw)
+        same_key = self.by_key.get(key, [])
+        if len(same_key) == 1:
+            return NameMatch(self.names[same_key[0]], "normalized", 1.0, [self.names[same_key[0]]])
+        if len(same_key) > 1:
+            return NameMatch(None, "ambiguous", 1.0, [self.names[i] for i in same_key])
+        if not key:
+            return NameMatch(None, "unmatched", 0.0, [])
+        grams = name_trigrams(key)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scored = sorted(
+            ((2 * count / (len(grams) + self.gram_counts[name_id]), name_id) for name_id, count in shared.items()),
+            reverse=True
+        )[:3]
+        candidates = [self.names[name_id] for score, name_id in scored if score >= FUZZY_MATCH_THRESHOLD / 2]
+        if not scored or scored[0][0] < FUZZY_MATCH_THRESHOLD:
+            return NameMatch(None, "unmatched", round(scored[0][0], 3) if scored else 0.0, candidates)
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < FUZZY_MATCH_MARGIN:
+            return NameMatch(None, "ambiguous", scored[0][0], candidates)
+        return NameMatch(self.names[scored[0][1]], "fuzzy", round(scored[0][0], 3), candidates)
+
+    def canonical(self, raw):
+        # Resolved name, or the raw name when there is no confident match
+        return self.resolve(raw).name or raw
+
+    def duplicate_groups(self):
+        return [[self.names[i] for i in ids] for ids in self.by_key.values() if len(ids) > 1]
+
+_faculty_name_index_cache = None  # (file signature, FacultyNameIndex)
+
+def load_faculty_names():
+    names = []
+    if os.path.exists(FAKE_FACULTY_PATH):
+        with open(FAKE_FACULTY_PATH, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for row in csv.DictReader(f):
+                name = row.get('faculty') or row.get('Faculty') or ''
+                if name.strip():
+                    names.append(name)
+    return names
+
+def get_faculty_name_index():
+    global _faculty_name_index_cache
+    signature = file_signature(FAKE_FACULTY_PATH)
+    cached = _faculty_name_index_cache
+    if cached and cached[0] == signature:
+        return cached[1]
+    index = FacultyNameIndex(load_faculty_names())
+    _faculty_name_index_cache = (signature, index)
+    return index
+
+def name_resolution_report(index, names):
+    # Summarise how a set of names resolved; exact matches are not listed
+    report = {"fuzzy": [], "ambiguous": [], "unmatched": []}
+    if not len(index):
+        return report
+    for raw in dict.fromkeys(names):
+        match = index.resolve(raw)
+        if match.status == "fuzzy":
+            report["fuzzy"].append({"name": raw, "resolved": match.name, "score": match.score})
+        elif match.status in ("ambiguous", "unmatched"):
+            report[match.status].append({"name": raw, "candidates": match.candidates})
+    return report
+
+# Assignment Validation
+def load_faculty_caps():
+    # Map faculty name -> Max Duties; read with the csv module so saving assignments stays cheap
+    caps = {}
+    if not os.path.exists(FAKE_FACULTY_PATH):
+        return caps
+    with open(FAKE_FACULTY_PATH, "r", encoding="utf-8", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            name = row.get('faculty') or row.get('Faculty') or ''
+            if not name.strip():
+                continue
+            try:
+                caps[name] = int(float(row.get('Max Duties') or ''))
+            except ValueError:
+                caps[name] = None
+    return caps
+
+def assignment_payload_error(assignments):
+    # Shape check before anything is written; a bad file breaks every reader until it is fixed by hand
+    if not isinstance(assignments, list):
+        return "Expected a list of assignments"
+    for position, item in enumerate(assignments):
+        if not isinstance(item, dict):
+            return f"Assignment {position} must be an object with date, shift and faculty"
+        for field in ("date", "shift", "faculty"):
+            value = item.get(field) or item.get(field.capitalize())
+            if not isinstance(value, str) or not value.strip():
+                return f"Assignment {position} needs a non-empty '{field}' string"
+    return None
+
+def validate_assignments(table, schedule=None, unavailability=None, faculty_caps=None):
+    if not isinstance(table, AssignmentTable):
+        table = AssignmentTable.from_records(table)
+    violations = []
+    valid_shifts = len(SHIFT_LABELS)
+    # Everything is keyed on the table's small ints: (faculty id, date ordinal, shift code)
+    unavailable = set()
+    for faculty, shifts in (unavailability or {}).items():
+        faculty_id = table.faculty_index.get(faculty)
+        if faculty_id is None:
+            continue
+        for shift in Shift:
+            for date in shifts.get(SHIFT_KEYS[SHIFT_LABELS[shift]], []):
+                unavailable.add((faculty_id, parse_date_ordinal(date), shift))
+    required = collections.Counter()  # (date ordinal, shift code) -> required head count
+    for day in schedule or []:
+        ordinal = parse_date_ordinal(day.get("date"))
+        for shift in Shift:
+            # Counts are summed over duplicate dates; non-numeric counts read as 0, as in the solver
+            required[(ordinal, shift)] += parse_count(day.get(SHIFT_KEYS[SHIFT_LABELS[shift]], 0))
+
+    def slot_violation(kind, index, message):
+        record = table[index]
+        return {"type": kind, "index": index, "date": record.date, "shift": record.shift, "faculty": record.faculty,
+                "message": message.format(faculty=record.faculty, date=record.date, shift=record.shift)}
+
+    booked = set()  # (faculty id, date ordinal, shift code)
+    slot_counts = collections.Counter()
+    for index, (faculty_id, ordinal, shift) in enumerate(zip(table.faculty_ids, table.date_ordinals, table.shift_codes)):
+        if shift >= valid_shifts:
+            violations.append(slot_violation("invalid_shift", index, "Unknown shift '{shift}'"))
+            continue
+        key = (faculty_id, ordinal, shift)
+        if key in booked:
+            violations.append(slot_violation("double_booked", index, "{faculty} is assigned more than once on {date} ({shift})"))
+        booked.add(key)
+        slot_counts[(ordinal, shift)] += 1
+        if key in unavailable:
+            violations.append(slot_violation("unavailable", index, "{faculty} is marked unavailable on {date} ({shift})"))
+        if schedule is not None and required.get((ordinal, shift), 0) == 0:
+            violations.append(slot_violation("unscheduled", index, "No duty is scheduled on {date} ({shift})"))
+
+    for faculty_id, count in enumerate(table.duty_counts()):
+        faculty = table.faculty_names[faculty_id]
+        cap = (faculty_caps or {}).get(faculty)
+        if cap is not None and count > cap:
+            violations.append({"type": "over_cap", "faculty": faculty, "assigned": count, "max_duties": cap,
+                               "message": f"{faculty} has {count} duties but Max Duties is {cap}"})
+
+    for (ordinal, shift), needed in required.items():
+        assigned = slot_counts.get((ordinal, shift), 0)
+        if assigned < needed:
+            date = datetime.date.fromordinal(ordinal).isoformat() if ordinal else ""
+            label = SHIFT_LABELS[shift]
+            violations.append({"type": "under_staffed", "date": date, "shift": label, "required": needed, "assigned": assigned,
+                               "message": f"{date} ({label}) needs {needed} faculty but has {assigned}"})
+    return violations
+
+def validate_current_assignments(table=None):
+    # Validate against the stored schedule, unavailability and Max Duties caps
+    if table is None:
+        table = get_assignment_table()
+    schedule = None
+    if os.path.exists(EXAM_SCHEDULE_PATH):
+        with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
+            schedule = json.load(f)
+    unavailability = {}
+    if os.path.exists(FACULTY_UNAVAILABILITY_PATH):
+        with open(FACULTY_UNAVAILABILITY_PATH, "r", encoding="utf-8") as f:
+            unavailability = json.load(f)
+    caps = load_faculty_caps()
+    name_index = get_faculty_name_index()
+    faculty_caps = {name: caps.get(name_index.canonical(name)) for name in table.faculty_names}
+    # Unavailability may also use another spelling; merge entries that resolve to the same faculty
+    unavailable_by_name = {}
+    for name, shifts in unavailability.items():
+        merged = unavailable_by_name.setdefault(name_index.canonical(name), {})
+        for key, dates in shifts.items():
+            merged.setdefault(key, []).extend(dates)
+    faculty_unavailability = {}
+    for name in table.faculty_names:
+        shifts = unavailable_by_name.get(name_index.canonical(name))
+        if shifts is not None:
+            faculty_unavailability[name] = shifts
+    return validate_assignments(table, schedule, faculty_unavailability, faculty_caps)
+
+# Substitute Finder
+# Indexes for "who can cover this slot" are rebuilt whenever assignments or unavailability are saved, so a
+# query is a walk over a pre-ranked roster with set lookups. Ranking: spare capacity first, then faculty with
+# no other duty that day, then lowest load relative to Max Duties, then junior designations.
+DESIGNATION_PRIORITY = [("assistant", 0), ("associate", 1), ("professor", 2)]
+
+def designation_rank(designation):
+    text = (designation or "").lower()
+    for keyword, rank in DESIGNATION_PRIORITY:
+        if keyword in text:
+            return rank
+    return len(DESIGNATION_PRIORITY)
+
+def load_faculty_roster():
+    roster = []
+    if not os.path.exists(FAKE_FACULTY_PATH):
+        return roster
+    with open(FAKE_FACULTY_PATH, "r", encoding="utf-8", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            name = row.get('faculty') or row.get('Faculty') or ''
+            if not name.strip():
+                continue
+            try:
+                max_duties = int(float(row.get('Max Duties') or ''))
+            except ValueError:
+                max_duties = None
+            roster.append({
+                "faculty": name,
+                "designation": (row.get('Designation') or '').strip(),
+                "max_duties": max_duties,
+                "phone": (row.get('Phone No') or '').strip(),
+                "email": (row.get('Email Id') or row.get('Email ID') or row.get('email') or '').strip(),
+            })
+    return roster
+
+class SubstituteIndex:
+    __slots__ = ("entries", "order", "full", "slot_faculty", "slot_names", "day_faculty", "unavailable")
+
+    def __init__(self, roster, table, unavailability, name_index):
+        position = {entry["faculty"]: i for i, entry in enumerate(roster)}
+        # AssignmentTable faculty id -> roster position (None for names not on the faculty list)
+        roster_ids = [position.get(name_index.canonical(name)) for name in table.faculty_names]
+        loads = [0] * len(roster)
+        self.slot_faculty = {}
+        self.slot_names = {}
+        self.day_faculty = {}
+        for faculty_id, ordinal, shift in zip(table.faculty_ids, table.date_ordinals, table.shift_codes):
+            key = (ordinal, shift)
+            self.slot_names.setdefault(key, []).append(table.faculty_names[faculty_id])
+            rid = roster_ids[faculty_id]
+            if rid is None:
+                continue
+            loads[rid] += 1
+            self.slot_faculty.setdefault(key, set()).add(rid)
+            day = self.day_faculty.setdefault(ordinal, {})
+            day[rid] = day.get(rid, 0) + 1
+        self.unavailable = {}
+        for name, shifts in (unavailability or {}).items():
+            rid = position.get(name_index.canonical(name))
+            if rid is None:
+                continue
+            for label, shift_key in SHIFT_KEYS.items():
+                for date in (shifts or {}).get(shift_key, []):
+                    key = (parse_date_ordinal(date), SHIFT_LABELS.index(label))
+                    self.unavailable.setdefault(key, set()).add(rid)
+        self.entries = []
+        for entry, load in zip(roster, loads):
+            cap = entry["max_duties"]
+            self.entries.append({**entry, "duties": load, "remaining": None if cap is None else cap - load})
+        self.full = {rid for rid, entry in enumerate(self.entries) if entry["remaining"] is not None and entry["remaining"] <= 0}
+
+        # Uncapped faculty are measured against the most generous cap, as in randomized assignment
+        known_caps = [entry["max_duties"] for entry in roster if entry["max_duties"]]
+        default_cap = max(known_caps) if known_caps else 1
+
+        def rank_key(rid):
+            entry = self.entries[rid]
+            cap = entry["max_duties"] or default_cap
+            return (entry["duties"] / cap, entry["duties"], designation_rank(entry["designation"]), entry["faculty"])
+        self.order = sorted(range(len(self.entries)), key=rank_key)
+
+    def assigned(self, ordinal, shift):
+        return list(self.slot_names.get((ordinal, shift), ()))
+
+    def find(self, ordinal, shift, limit=10):
+        busy = self.slot_faculty.get((ordinal, shift), ())
+        blocked = self.unavailable.get((ordinal, shift), ())
+        same_day = self.day_faculty.get(ordinal, {})
+        free, other_shift, full = [], [], []
+        for rid in self.order:
+            if rid in busy or rid in blocked:
+                continue
+            if rid in self.full:
+                full.append(rid)
+            elif rid in same_day:
+                other_shift.append(rid)
+            else:
+                free.append(rid)
+                if len(free) >= limit:
+                    break
+        ranked = (free + other_shift + full)[:limit]
+        return [{**self.entries[rid], "same_day_duties": same_day.get(rid, 0)} for rid in ranked]
+
+_substitute_index_cache = None  # (input signatures, SubstituteIndex)
+
+def get_substitute_index():
+    global _substitute_index_cache
+    signature = tuple(file_signature(path) for path in (ASSIGNMENTS_PATH, FACULTY_UNAVAILABILITY_PATH, FAKE_FACULTY_PATH))
+    cached = _substitute_index_cache
+    if cached and cached[0] == signature:
+        return cached[1]
+    unavailability = {}
+    if os.path.exists(FACULTY_UNAVAILABILITY_PATH):
+        with open(FACULTY_UNAVAILABILITY_PATH, "r", encoding="utf-8") as f:
+            unavailability = json.load(f)
+    index = SubstituteIndex(load_faculty_roster(), get_assignment_table(), unavailability, get_faculty_name_index())
+    _substitute_index_cache = (signature, index)
+    return index
+
+# Randomized Assignment
+# Each restart fills the slots greedily in a shuffled order with random tie-breaks, then improves the plan by
+# moving single duties between faculty. Restarts are independent and seeded from (seed, restart number), so
+# they can run on any core; the plan with the lowest fairness score wins, ties going to the lower restart.
+RANDOM_TIME_BUDGET = 2.0  # seconds
+RANDOM_MAX_RESTARTS = 10000
+UNFILLED_PENALTY = 1000.0
+OVER_CAP_PENALTY = 100.0
+SAME_DAY_PENALTY = 10.0
+
+def build_assignment_problem(faculty_names, faculty_caps, schedule, unavailability):
+    # Everything becomes small ints: faculty ids, day indexes and (day, shift) slots
+    days = []
+    day_index = {}
+    slots = []  # (day, shift code, required)
+    for day in schedule:
+        date = str(day.get("date"))
+        if date not in day_index:
+            day_index[date] = len(days)
+            days.append(date)
+        for code, label in enumerate(SHIFT_LABELS):
+            required = parse_count(day.get(SHIFT_KEYS[label], 0))
+            if required > 0:
+                slots.append((day_index[date], code, required))
+    # Uncapped faculty are weighted like the most generous cap so they take a fair share, not everything
+    known_caps = [cap for cap in faculty_caps if cap]
+    default_cap = max(known_caps) if known_caps else 1
+    caps = list(faculty_caps)
+    weights = [cap if cap else default_cap for cap in faculty_caps]
+    position = {name: i for i, name in enumerate(faculty_names)}
+    blocked = set()
+    for name, shifts in (unavailability or {}).items():
+        fid = position.get(name)
+        if fid is None:
+            continue
+        for code, label in enumerate(SHIFT_LABELS):
+            for date in (shifts or {}).get(SHIFT_KEYS[label], []):
+                day = day_index.get(str(date)[:10])
+                if day is not None:
+                    blocked.add((fid, day, code))
+    return {"days": days, "slots": slots, "caps": caps, "weights": weights, "blocked": blocked}
+
+def fairness_score(problem, plan):
+    caps, weights = problem["caps"], problem["weights"]
+    loads = [0] * len(caps)
+    day_loads = collections.Counter()
+    unfilled = 0
+    for (day, _, required), chosen in zip(problem["slots"], plan):
+        unfilled += required - len(chosen)
+        for fid in chosen:
+            loads[fid] += 1
+            day_loads[(fid, day)] += 1
+    over_cap = sum(max(0, load - cap) for load, cap in zip(loads, caps) if cap is not None)
+    same_day = sum(count - 1 for count in day_loads.values())
+    # Sum of load^2 / cap is smallest when duties are spread in proportion to Max Duties
+    spread = sum(load * load / weight for load, weight in zip(loads, weights))
+    score = UNFILLED_PENALTY * unfilled + OVER_CAP_PENALTY * over_cap + SAME_DAY_PENALTY * same_day + spread
+    return {"score": round(score, 4), "unfilled": unfilled, "over_cap": over_cap, "same_day": same_day,
+            "spread": round(spread, 4), "min_load": min(loads, default=0), "max_load": max(loads, default=0)}
+
+def randomized_restart(problem, seed, restart):
+    import random
+    rng = random.Random(f"{seed}:{restart}")
+    slots, caps, weights, blocked = problem["slots"], problem["caps"], problem["weights"], problem["blocked"]
+    faculty_count = len(caps)
+    limits = [cap if cap is not None else float("inf") for cap in caps]
+    loads = [0] * faculty_count
+    day_loads = collections.Counter()
+    tie_break = [rng.random() for _ in range(faculty_count)]
+    plan = [[] for _ in slots]
+
+    def cost(fid, day):
+        return (loads[fid] >= limits[fid], day_loads[(fid, day)], (loads[fid] + 1) / weights[fid], tie_break[fid])
+
+    order = list(range(len(slots)))
+    rng.shuffle(order)
+    for s in order:
+        day, code, required = slots[s]
+        chosen = plan[s]
+        for _ in range(required):
+            candidates = [fid for fid in range(faculty_count) if fid not in chosen and (fid, day, code) not in blocked]
+            if not candidates:
+                break
+            fid = min(candidates, key=lambda f: cost(f, day))
+            chosen.append(fid)
+            loads[fid] += 1
+            day_loads[(fid, day)] += 1
+
+    # Local search: move one duty at a time to a faculty member who makes the plan fairer
+    def penalty(fid, day, load, day_load):
+        over = max(0, load - caps[fid]) if caps[fid] is not None else 0
+        return OVER_CAP_PENALTY * over + SAME_DAY_PENALTY * max(0, day_load - 1) + load * load / weights[fid]
+
+    filled = [(s, i) for s in range(len(slots)) for i in range(len(plan[s]))]
+    if filled and faculty_count > 1:
+        for _ in range(20 * len(filled)):
+            s, i = filled[rng.randrange(len(filled))]
+            day, code, _ = slots[s]
+            old = plan[s][i]
+            new = rng.randrange(faculty_count)
+            if new in plan[s] or (new, day, code) in blocked:
+                continue
+            before = (penalty(old, day, loads[old], day_loads[(old, day)])
+                      + penalty(new, day, loads[new], day_loads[(new, day)]))
+            after = (penalty(old, day, loads[old] - 1, day_loads[(old, day)] - 1)
+                     + penalty(new, day, loads[new] + 1, day_loads[(new, day)] + 1))
+            if after < before:
+                plan[s][i] = new
+                loads[old] -= 1
+                loads[new] += 1
+                day_loads[(old, day)] -= 1
+                day_loads[(new, day)] += 1
+    return plan
+
+def run_assignment_restarts(problem, seed, restarts, deadline):
+    # Worker entry point: restarts is this worker's share of restart numbers; stops once the deadline passes
+    best = None
+    completed = 0
+    for restart in restarts:
+        if completed and time.time() >= deadline:
+            break
+        plan = randomized_restart(problem, seed, restart)
+        score = fairness_score(problem, plan)
+        completed += 1
+        if best is None or (score["score"], restart) < (best[0]["score"], best[1]):
+            best = (score, restart, plan)
+    return best, completed
+
+def randomized_assignments(faculty_names, faculty_caps, schedule, unavailability, seed,
+                           time_budget=RANDOM_TIME_BUDGET, restarts=None, workers=None):
+    problem = build_assignment_problem(faculty_names, faculty_caps, schedule, unavailability)
+    # An explicit restart count runs every restart so (seed, restarts) is reproducible; time_budget only
+    # bounds the open-ended search
+    deadline = float("inf") if restarts else time.time() + max(float(time_budget), 0.0)
+    restarts = min(int(restarts), RANDOM_MAX_RESTARTS) if restarts else RANDOM_MAX_RESTARTS
+    workers = max(1, min(int(workers or os.cpu_count() or 1), restarts))
+    shares = [range(w, restarts, workers) for w in range(workers)]
+    results = []
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_assignment_restarts, problem, seed, share, deadline) for share in shares]
+                results = [future.result() for future in futures]
+        except Exception as e:
+            print(f"Warning: parallel restarts failed, running in-process: {e}")
+            results = []
+    if not results:
+        results = [run_assignment_restarts(problem, seed, range(restarts), deadline)]
+    best = min((result for result, _ in results if result), key=lambda result: (result[0]["score"], result[1]))
+    score, restart, plan = best
+    assignments = []
+    for (day, code, _), chosen in sorted(zip(problem["slots"], plan), key=lambda item: (item[0][0], item[0][1])):
+        for fid in chosen:
+            assignments.append({"date": problem["days"][day], "shift": SHIFT_LABELS[code], "faculty": faculty_names[fid]})
+    stats = dict(score, seed=seed, best_restart=restart, restarts=sum(completed for _, completed in results), workers=workers)
+    return assignments, stats
+
+# Multi-worker Coordination
+# Every worker shares the JSON stores, so writers take a cross-process lock and replace files atomically.
+# Change events and generated reports also live on disk so all workers see them.
+STATE_DIR = os.environ.get("FACULTY_DUTY_STATE_DIR", ".faculty_duty")
+STORE_LOCK_PATH = os.path.join(STATE_DIR, "store.lock")
+EVENT_JOURNAL_PATH = os.path.join(STATE_DIR, "events.jsonl")
+EVENT_SEQ_PATH = os.path.join(STATE_DIR, "events.seq")
+REPORT_CACHE_DIR = os.path.join(STATE_DIR, "report_cache")
+REPORT_INPUT_PATHS = [ASSIGNMENTS_PATH, EXAM_SCHEDULE_PATH, FACULTY_UNAVAILABILITY_PATH, FAKE_FACULTY_PATH, EXAM_CONFIG_PATH, REPORT_TEMPLATES_PATH]
+
+_store_thread_lock = threading.RLock()
+_store_lock_depth = threading.local()
+
+@contextlib.contextmanager
+def store_lock():
+    # Re-entrant within a thread; the file lock is only taken by the outermost holder
+    with _store_thread_lock:
+        depth = getattr(_store_lock_depth, "value", 0)
+        _store_lock_depth.value = depth + 1
+        try:
+            if depth:
+                yield
+                return
+            os.makedirs(STATE_DIR, exist_ok=True)
+            with open(STORE_LOCK_PATH, "a+b") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            _store_lock_depth.value = depth
+
+# Temporary files are created 0600; replacements keep the old file's mode, or get the usual umask default
+_process_umask = os.umask(0)
+os.umask(_process_umask)
+DEFAULT_FILE_MODE = 0o666 & ~_process_umask
+
+def replace_file(temp_path, path):
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
+
+def write_file_atomic(path, write):
+    # Readers in other workers see either the old or the new file, never a partial one
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        replace_file(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def report_cache_path(report_type):
+    parts = [report_type] + [f"{path}={file_signature(path)}" for path in REPORT_INPUT_PATHS]
+    if report_type in ("word", "pdf"):
+        parts.append(datetime.date.today().isoformat())  # the chart header carries today's date
+    key = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return os.path.join(REPORT_CACHE_DIR, f"{report_type}-{key}.bin")
+
+def read_cached_report(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def store_cached_report(report_type, data, cache_path):
+    # cache_path is computed before generation so a concurrent edit can only make the entry unreachable
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    write_file_atomic(cache_path, lambda f: f.write(data))
+    prefix = f"{report_type}-"
+    for name in os.listdir(REPORT_CACHE_DIR):
+        stale = os.path.join(REPORT_CACHE_DIR, name)
+        if name.startswith(prefix) and name.endswith(".bin") and stale != cache_path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+# Live Change Notifications (Server-Sent Events)
+# Events are appended to a shared journal with global ids; each worker tails it and fans out to its own subscribers.
+LIVE_STORES = {
+    ASSIGNMENTS_PATH: "assignments",
+    EXAM_SCHEDULE_PATH: "exam-schedule",
+    FACULTY_UNAVAILABILITY_PATH: "faculty-unavailability",
+}
+EVENT_HISTORY_SIZE = 500  # events kept for Last-Event-ID replay
+EVENT_QUEUE_SIZE = 100  # per-subscriber backlog before the client is told to resync
+EVENT_KEEPALIVE_SECONDS = 15
+EVENT_POLL_SECONDS = 0.5  # how often a worker checks the journal for other workers' changes
+EVENT_JOURNAL_MAX_BYTES = 1024 * 1024
+EVENT_DELTA_MAX_ROWS = 500  # larger deltas are sent as a resync so bulk saves do not bloat the journal
+EVENT_DELTA_MAX_BYTES = 64 * 1024
+
+_event_subscribers = set()
+_event_history = collections.deque(maxlen=EVENT_HISTORY_SIZE)
+_event_seq = 0  # last journal id delivered by this worker
+_event_loop = None
+_event_watcher = None
+_journal_signature = None
+_journal_offset = 0
+
+def format_event(event_id, event, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+def list_delta(old, new, key):
+    # Multiset difference so duplicate rows are added/removed one at a time
+    old_counts = collections.Counter(key(item) for item in old)
+    new_counts = collections.Counter(key(item) for item in new)
+    added = list((new_counts - old_counts).elements())
+    removed = list((old_counts - new_counts).elements())
+    if not added and not removed:
+        return None
+    return {"added": added, "removed": removed}
+
+def store_delta(path, old, new):
+    if path == ASSIGNMENTS_PATH:
+        return list_delta(old or [], new or [], lambda a: (a.get("date"), a.get("shift"), a.get("faculty")))
+    if path == EXAM_SCHEDULE_PATH:
+        delta = list_delta(old or [], new or [], lambda d: json.dumps(d, sort_keys=True))
+        if delta:
+            delta = {k: [json.loads(v) for v in items] for k, items in delta.items()}
+        return delta
+    if path == FACULTY_UNAVAILABILITY_PATH:
+        old, new = old or {}, new or {}
+        updated = {faculty: value for faculty, value in new.items() if old.get(faculty) != value}
+        removed = [faculty for faculty in old if faculty not in new]
+        if not updated and not removed:
+            return None
+        return {"updated": updated, "removed": removed}
+    return None
+
+def _fan_out(message):
+    for queue in list(_event_subscribers):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog and ask it to re-fetch instead of buffering without bound
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(format_event(_event_seq, "resync", {}))
+
+def drain_event_journal():
+    # Runs on the event loop: deliver journal entries this worker has not seen yet, in id order
+    global _event_seq, _journal_signature, _journal_offset
+    signature = file_signature(EVENT_JOURNAL_PATH)
+    if signature is None:
+        return
+    if _journal_signature is None or signature[0] != _journal_signature[0] or signature[2] < _journal_offset:
+        _journal_offset = 0  # first read, or the journal was compacted
+    _journal_signature = signature
+    if signature[2] == _journal_offset:
+        return
+    with open(EVENT_JOURNAL_PATH, "rb") as f:
+        f.seek(_journal_offset)
+        chunk = f.read()
+    complete = chunk.rfind(b"\n") + 1
+    _journal_offset += complete
+    for raw in chunk[:complete].splitlines():
+        entry = json.loads(raw)
+        if entry["id"] <= _event_seq:
+            continue
+        _event_seq = entry["id"]
+        message = format_event(entry["id"], entry["event"], entry["data"])
+        _event_history.append((entry["id"], message))
+        _fan_out(message)
+
+async def watch_event_journal():
+    global _event_watcher
+    try:
+        while _event_subscribers:
+            drain_event_journal()
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+    finally:
+        _event_watcher = None
+
+def compact_event_journal():
+    with open(EVENT_JOURNAL_PATH, "rb") as f:
+        lines = f.read().splitlines(keepends=True)[-EVENT_HISTORY_SIZE:]
+    write_file_atomic(EVENT_JOURNAL_PATH, lambda f: f.writelines(lines))
+
+def delta_size(delta):
+    return sum(len(items) for items in delta.values() if isinstance(items, (list, dict)))
+
+def publish_change(store, delta):
+    payload = json.dumps(delta, ensure_ascii=False, separators=(",", ":"))
+    if store != "resync" and (delta_size(delta) > EVENT_DELTA_MAX_ROWS or len(payload) > EVENT_DELTA_MAX_BYTES):
+        store, delta = "resync", {"stores": [store]}
+    with store_lock():
+        try:
+            with open(EVENT_SEQ_PATH, "r", encoding="utf-8") as f:
+                event_id = int(f.read().strip() or 0) + 1
+        except (FileNotFoundError, ValueError):
+            event_id = 1
+        write_file_atomic(EVENT_SEQ_PATH, lambda f: f.write(str(event_id).encode("utf-8")))
+        entry = json.dumps({"id": event_id, "event": store, "data": delta}, ensure_ascii=False, separators=(",", ":"))
+        with open(EVENT_JOURNAL_PATH, "a", encoding="utf-8") as f:
+            f.write(entry + "\n")
+        if os.path.getsize(EVENT_JOURNAL_PATH) > EVENT_JOURNAL_MAX_BYTES:
+            compact_event_journal()
+    loop = _event_loop
+    if loop is None or not _event_subscribers:
+        return
+    try:
+        in_loop = asyncio.get_running_loop() is loop
+    except RuntimeError:
+        in_loop = False
+    if in_loop:
+        drain_event_journal()
+    else:
+        loop.call_soon_threadsafe(drain_event_journal)
+
+def save_json_store(path, data, table=None):
+    with store_lock():
+        old = None
+        if path in LIVE_STORES and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    old = json.load(f)
+            except (ValueError, OSError):
+                old = None
+        write_file_atomic(path, lambda f: f.write(json.dumps(data, ensure_ascii=False).encode("utf-8")))
+        if path == ASSIGNMENTS_PATH:
+            cache_assignment_table(table or AssignmentTable.from_records(data))
+        if path in (ASSIGNMENTS_PATH, FACULTY_UNAVAILABILITY_PATH):
+            get_substitute_index()  # rebuild now so the next substitute query is just a lookup
+        if path in LIVE_STORES:
+            delta = store_delta(path, old, data)
+            if delta:
+                publish_change(LIVE_STORES[path], delta)
+        if path in (ASSIGNMENTS_PATH, EXAM_CONFIG_PATH, REPORT_TEMPLATES_PATH):
+            try:
+                refresh_calendar_feeds()
+            except Exception as e:
+                print(f"Warning: could not refresh calendar feeds: {e}")
+
+@app.get("/events")
+async def stream_events(request: Request):
+    global _event_loop, _event_watcher
+    _event_loop = asyncio.get_running_loop()
+    drain_event_journal()
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("lastEventId")
+    queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    backlog = []
+    if last_event_id is not None:
+        try:
+            last_seen = int(last_event_id)
+        except ValueError:
+            last_seen = -1
+        oldest = _event_history[0][0] if _event_history else _event_seq + 1
+        if last_seen + 1 < oldest and last_seen < _event_seq:
+            backlog.append(format_event(_event_seq, "resync", {}))
+        else:
+            backlog.extend(message for seq, message in _event_history if seq > last_seen)
+    else:
+        backlog.append(format_event(_event_seq, "hello", {}))
+    _event_subscribers.add(queue)
+    if _event_watcher is None:
+        _event_watcher = asyncio.create_task(watch_event_journal())
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            for message in backlog:
+                yield message
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+        finally:
+            _event_subscribers.discard(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Faculty Calendar Feeds (iCalendar)
+# Feeds are precomputed under STATE_DIR and only rewritten for faculty whose duties changed;
+# clients polling with If-None-Match get a 304 without the feed being read.
+CALENDAR_DIR = os.path.join(STATE_DIR, "calendars")
+CALENDAR_INDEX_PATH = os.path.join(CALENDAR_DIR, "index.json")
+CALENDAR_UTC_OFFSET = datetime.timedelta(hours=5, minutes=30)  # exam timings are Indian Standard Time
+
+_calendar_index_cache = None  # (file signature, index)
+
+def shift_timings(exam_config):
+    # Shift -> (start, end), the same timings printed on the duty chart
+    return get_report_template(exam_config).shift_times
+
+def calendar_feed_id(faculty):
+    slug = re.sub(r"[^a-z0-9]+", "-", faculty.lower()).strip("-") or "faculty"
+    return f"{slug}-{hashlib.sha1(faculty.encode('utf-8')).hexdigest()[:8]}"
+
+def ics_escape(text):
+    return str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_fold(line):
+    # RFC 5545 limits content lines to 75 octets; continuation lines start with a space
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # never split a UTF-8 sequence
+        parts.append(encoded[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts)
+
+def ics_utc(date, time_of_day):
+    local = datetime.datetime.combine(date, time_of_day)
+    return (local - CALENDAR_UTC_OFFSET).strftime("%Y%m%dT%H%M%SZ")
+
+def render_faculty_calendar(faculty, duties, exam_config, generated_at):
+    exam_type = exam_config.get("examType", "MID SEM")
+    exam_name = f"{exam_type} {exam_config.get('semester', 'MO')} {exam_config.get('year', '2025')}"
+    department = exam_config.get("department", "Computer Science & Engineering")
+    institute = exam_config.get("institute", "BIT MESRA, RANCHI")
+    timings = shift_timings(exam_config)
+    # The reporting instructions are the duty chart's notes, as in the duty emails
+    notes = get_report_template(exam_config).notes
+    description = "\n".join([f"Department of {department}, {institute}."] + [f"{i}. {note}" for i, note in enumerate(notes, 1)])
+    faculty_hash = hashlib.sha1(faculty.encode("utf-8")).hexdigest()[:12]
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Faculty Duty Assignment System//Exam Duties//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{ics_escape(f'Exam duties - {faculty}')}",
+    ]
+    for ordinal, shift in duties:
+        date = datetime.date.fromordinal(ordinal)
+        start, end = timings[shift]
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{date.strftime('%Y%m%d')}-{SHIFT_KEYS[shift]}-{faculty_hash}@faculty-duty",
+            f"DTSTAMP:{generated_at}",
+            f"DTSTART:{ics_utc(date, start)}",
+            f"DTEND:{ics_utc(date, end)}",
+            f"SUMMARY:{ics_escape(f'Invigilation duty ({shift}) - {exam_name}')}",
+            f"LOCATION:{ics_escape(institute)}",
+            f"DESCRIPTION:{ics_escape(description)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(ics_fold(line) for line in lines) + "\r\n"
+
+def load_calendar_index():
+    global _calendar_index_cache
+    signature = file_signature(CALENDAR_INDEX_PATH)
+    if signature is None:
+        return {"source": None, "feeds": {}}
+    cached = _calendar_index_cache
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(CALENDAR_INDEX_PATH, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    _calendar_index_cache = (signature, index)
+    return index
+
+def calendar_source():
+    # Signatures of the files the feeds are built from, in the JSON form stored in the index
+    return [list(signature) if signature else None for signature in (file_signature(ASSIGNMENTS_PATH), file_signature(EXAM_CONFIG_PATH), file_signature(REPORT_TEMPLATES_PATH),
+                                                                                file_signature(FAKE_FACULTY_PATH))]
+
+def refresh_calendar_feeds():
+    # Rebuild only the feeds whose duties or exam details changed since the last refresh
+    with store_lock():
+        source = calendar_source()
+        index = load_calendar_index()
+        if index.get("source") == source:
+            return index
+        table = get_assignment_table()
+        exam_config = load_exam_config()
+        config_key = [exam_config.get(k) for k in ("examType", "semester", "year", "department", "institute")]
+        config_key.append({shift: [str(start), str(end)] for shift, (start, end) in shift_timings(exam_config).items()})
+        config_key.append(get_report_template(exam_config).notes)
+        # One feed per faculty member, whatever spelling the assignments use, as with duty emails
+        name_index = get_faculty_name_index()
+        canonical = [name_index.canonical(name) for name in table.faculty_names]
+        duties = collections.defaultdict(set)
+        valid_shifts = len(SHIFT_LABELS)
+        for faculty_id, ordinal, shift in zip(table.faculty_ids, table.date_ordinals, table.shift_codes):
+            if ordinal and shift < valid_shifts:
+                duties[canonical[faculty_id]].add((ordinal, SHIFT_LABELS[shift]))
+
+        os.makedirs(CALENDAR_DIR, exist_ok=True)
+        old_feeds = index.get("feeds", {})
+        feeds = {}
+        generated_at = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        rebuilt = 0
+        for faculty, faculty_duties in duties.items():
+            feed_id = calendar_feed_id(faculty)
+            ordered = sorted(faculty_duties)
+            digest = hashlib.sha1(json.dumps([faculty, config_key, ordered]).encode("utf-8")).hexdigest()
+            feed_path = os.path.join(CALENDAR_DIR, f"{feed_id}.ics")
+            previous = old_feeds.get(feed_id)
+            if previous and previous["digest"] == digest and os.path.exists(feed_path):
+                feeds[feed_id] = previous
+                continue
+            content = render_faculty_calendar(faculty, ordered, exam_config, generated_at).encode("utf-8")
+            write_file_atomic(feed_path, lambda f: f.write(content))
+            feeds[feed_id] = {"faculty": faculty, "digest": digest, "etag": f'"{digest[:16]}"', "duties": len(ordered)}
+            rebuilt += 1
+        for feed_id in old_feeds:
+            if feed_id not in feeds:
+                stale = os.path.join(CALENDAR_DIR, f"{feed_id}.ics")
+                if os.path.exists(stale):
+                    os.remove(stale)
+        index = {"source": source, "feeds": feeds}
+        write_file_atomic(CALENDAR_INDEX_PATH, lambda f: f.write(json.dumps(index, ensure_ascii=False).encode("utf-8")))
+        print(f"Calendar feeds refreshed: {rebuilt} rebuilt, {len(feeds) - rebuilt} unchanged")
+        return index
+
+def current_calendar_index():
+    index = load_calendar_index()
+    if index.get("source") != calendar_source():
+        index = refresh_calendar_feeds()
+    return index
+
+@app.get("/calendars")
+def list_calendar_feeds():
+    index = current_calendar_index()
+    return [
+        {"faculty": feed["faculty"], "feed": f"/calendars/{feed_id}.ics", "duties": feed["duties"]}
+        for feed_id, feed in sorted(index["feeds"].items(), key=lambda item: item[1]["faculty"])
+    ]
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match is a comma-separated list, "*", and uses weak comparison (a W/ prefix is ignored)
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+@app.get("/calendars/{feed_id}.ics")
+def get_calendar_feed(feed_id: str, request: Request):
+    index = current_calendar_index()
+    feed = index["feeds"].get(feed_id)
+    if feed is None:
+        return JSONResponse(status_code=404, content={"error": "No calendar feed for this faculty"})
+    headers = {"ETag": feed["etag"], "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), feed["etag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        os.path.join(CALENDAR_DIR, f"{feed_id}.ics"),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers
+    )
+
+# Duty Email Notifications
+# A send job renders one message per faculty member and hands them to a small pool of SMTP connections.
+# Each connection sends its messages in batches from a worker thread, so the event loop is never blocked.
+# A shared token bucket caps the send rate, transient failures are retried with backoff, and every outcome
+# is appended to the send log. Point FACULTY_DUTY_SMTP_HOST/PORT at a local stand-in (e.g. aiosmtpd) to test.
+SMTP_HOST = os.environ.get("FACULTY_DUTY_SMTP_HOST", "localhost")
+SMTP_PORT = int(os.environ.get("FACULTY_DUTY_SMTP_PORT", "25"))
+SMTP_USER = os.environ.get("FACULTY_DUTY_SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("FACULTY_DUTY_SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.environ.get("FACULTY_DUTY_SMTP_STARTTLS", "0") == "1"
+SMTP_SENDER = os.environ.get("FACULTY_DUTY_SMTP_FROM", "exam-office@localhost")
+SMTP_CONNECTIONS = int(os.environ.get("FACULTY_DUTY_SMTP_CONNECTIONS", "4"))
+SMTP_BATCH_SIZE = int(os.environ.get("FACULTY_DUTY_SMTP_BATCH", "20"))  # messages per connection hand-off
+SMTP_RATE = float(os.environ.get("FACULTY_DUTY_SMTP_RATE", "50"))  # messages per second across all connections
+SMTP_MAX_ATTEMPTS = 3
+SMTP_RETRY_SECONDS = 1.0  # doubled on each retry
+SMTP_TIMEOUT = 30
+NOTIFICATION_LOG_PATH = os.path.join(STATE_DIR, "notifications.jsonl")
+
+_notification_jobs = {}  # job id -> progress, for jobs started by this worker
+
+def render_duty_email(faculty, email, duties, exam_config):
+    from email.message import EmailMessage
+    exam_type = exam_config.get("examType", "")
+    timings = shift_timings(exam_config)
+    title = " ".join(part for part in [exam_type, "Examination", exam_config.get("semester", ""), exam_config.get("year", "")] if part)
+    lines = [f"Dear {faculty.strip()},", "",
+             f"You have been assigned the following invigilation duties for the {title}"
+             + (f" ({exam_config['department']})" if exam_config.get("department") else "") + ":", ""]
+    for ordinal, shift in duties:
+        date = datetime.date.fromordinal(ordinal)
+        start, end = timings.get(shift, (None, None))
+        timing = f"{start:%I:%M %p} - {end:%I:%M %p}" if start else ""
+        lines.append(f"  {date:%d-%m-%Y} ({date:%A})  {shift:<12} {timing}".rstrip())
+    lines += ["", f"Total duties: {len(duties)}", ""]
+    # Same instructions as the duty chart, so the reporting time cannot disagree with it
+    notes = get_report_template(exam_config).notes
+    if notes:
+        lines += ["Please note:"] + [f"  {i}. {note}" for i, note in enumerate(notes, 1)] + [""]
+    lines += ["Examination Cell", exam_config.get("institute", "")]
+    message = EmailMessage()
+    message["From"] = SMTP_SENDER
+    message["To"] = email
+    message["Subject"] = f"Invigilation duties: {title}".strip()
+    message.set_content("\n".join(lines).rstrip() + "\n")
+    return message
+
+def build_duty_emails(only=None):
+    # -> (messages, skipped); one message per faculty member with duties and an email address
+    table = get_assignment_table()
+    name_index = get_faculty_name_index()
+    roster = {entry["faculty"]: entry for entry in load_faculty_roster()}
+    exam_config = load_exam_config()
+    duties = collections.defaultdict(list)
+    for faculty_id, ordinal, shift in zip(table.faculty_ids, table.date_ordinals, table.shift_codes):
+        if ordinal:
+            duties[name_index.canonical(table.faculty_names[faculty_id])].append((ordinal, table.shift_labels[shift]))
+    wanted = {name_index.canonical(name) for name in only} if only else None
+    messages, skipped = [], []
+    for faculty in sorted(duties):
+        if wanted is not None and faculty not in wanted:
+            continue
+        email = roster.get(faculty, {}).get("email", "")
+        if "@" not in email:
+            skipped.append({"faculty": faculty, "reason": "no email address"})
+            continue
+        messages.append((faculty, email, render_duty_email(faculty, email, sorted(duties[faculty]), exam_config)))
+    return messages, skipped
+
+def log_notifications(entries):
+    # One O_APPEND write per batch keeps lines from different workers whole without taking the store lock,
+    # which saves can hold for a while; called from a worker thread, never on the event loop
+    if not entries:
+        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+    fd = os.open(NOTIFICATION_LOG_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, DEFAULT_FILE_MODE)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+class SendRateLimiter:
+    # Token bucket shared by all connections of a job
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, count=1):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(self.next_slot, now) + self.interval * count
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class SmtpConnection:
+    # One pooled connection, used from a single worker thread at a time and reopened after errors
+    def __init__(self):
+        self.client = None
+
+    def open(self):
+        import smtplib
+        client = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            client.starttls()
+        if SMTP_USER:
+            client.login(SMTP_USER, SMTP_PASSWORD)
+        self.client = client
+
+    def send_batch(self, batch):
+        # -> [(item, error or None, permanent)]; a connection failure fails the rest of the batch as transient
+        import smtplib
+        results = []
+        for i, item in enumerate(batch):
+            try:
+                if self.client is None:
+                    self.open()
+                self.client.send_message(item["message"])
+                results.append((item, None, False))
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                code = getattr(e, "smtp_code", None)
+                if code is None and isinstance(e, smtplib.SMTPRecipientsRefused):
+                    code = min((status for status, _ in e.recipients.values()), default=None)
+                results.append((item, str(e), code is not None and code >= 500))
+            except (smtplib.SMTPException, OSError) as e:
+                self.close()
+                results.extend((other, str(e), False) for other in batch[i:])
+                break
+        return results
+
+    def close(self):
+        if self.client is not None:
+            try:
+                self.client.quit()
+            except Exception:
+                pass
+            self.client = None
+
+async def run_notification_job(job, messages):
+    queue = asyncio.Queue()
+    for faculty, email, message in messages:
+        queue.put_nowait({"faculty": faculty, "email": email, "message": message, "attempts": 0})
+    limiter = SendRateLimiter(SMTP_RATE)
+    pending = len(messages)
+    done = asyncio.Event()
+    if not pending:
+        done.set()
+
+    def finish(item, status, error=None):
+        # -> the send log entry; the caller writes it off the event loop
+        nonlocal pending
+        job[status] += 1
+        pending -= 1
+        return {"job": job["id"], "faculty": item["faculty"], "email": item["email"], "status": status,
+                "attempts": item["attempts"], "error": error, "time": datetime.datetime.now().isoformat(timespec="seconds")}
+
+    async def retry_later(item, delay):
+        await asyncio.sleep(delay)
+        queue.put_nowait(item)
+
+    async def worker():
+        connection = SmtpConnection()
+        try:
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < SMTP_BATCH_SIZE and not queue.empty():
+                    batch.append(queue.get_nowait())
+                await limiter.acquire(len(batch))
+                for item in batch:
+                    item["attempts"] += 1
+                entries = []
+                for item, error, permanent in await asyncio.to_thread(connection.send_batch, batch):
+                    if error is None:
+                        entries.append(finish(item, "sent"))
+                    elif permanent or item["attempts"] >= SMTP_MAX_ATTEMPTS:
+                        entries.append(finish(item, "failed", error))
+                    else:
+                        asyncio.ensure_future(retry_later(item, SMTP_RETRY_SECONDS * 2 ** (item["attempts"] - 1)))
+                await asyncio.to_thread(log_notifications, entries)
+                if not pending:
+                    done.set()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, min(SMTP_CONNECTIONS, len(messages))))]
+    try:
+        await done.wait()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        job["status"] = "finished"
+        job["finished"] = datetime.datetime.now().isoformat(timespec="seconds")
+        print(f"Notification job {job['id']}: {job['sent']} sent, {job['failed']} failed")
+
+def read_notification_log(job_id=None):
+    entries = []
+    if os.path.exists(NOTIFICATION_LOG_PATH):
+        with open(NOTIFICATION_LOG_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if job_id is None or entry.get("job") == job_id:
+                    entries.append(entry)
+    return entries
+
+# Dataset Snapshots
+# One file holding all six data files. Layout: magic, version, a section directory, then the sections.
+# Assignments are stored as the AssignmentTable's typed columns (little-endian), so loading skips JSON
+# parsing and the table is rebuilt straight from the arrays. Sections are zlib-compressed unless the
+# snapshot is exported with compress=false, and snapshots are read through mmap so only the sections
+# actually used are paged in.
+SNAPSHOT_MAGIC = b"FDSNAP\x00\x00"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sHH")
+SNAPSHOT_ENTRY = struct.Struct("<BQQQI")  # codec, offset, stored length, raw length, crc32 of raw bytes
+SNAPSHOT_RAW, SNAPSHOT_ZLIB = 0, 1
+SNAPSHOT_JSON_STORES = [EXAM_SCHEDULE_PATH, FACULTY_UNAVAILABILITY_PATH, FACULTY_GROUPS_PATH, EXAM_CONFIG_PATH, REPORT_TEMPLATES_PATH]
+SNAPSHOT_COLUMNS = [("faculty_ids", "I"), ("date_ordinals", "i"), ("shift_codes", "B")]
+
+def column_bytes(column):
+    if sys.byteorder == "big" and column.itemsize > 1:
+        column = array.array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def column_from_bytes(typecode, data):
+    column = array.array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big" and column.itemsize > 1:
+        column.byteswap()
+    return column
+
+def build_snapshot(compress=True):
+    sections = {}
+    with store_lock():
+        table = get_assignment_table()
+        for path in SNAPSHOT_JSON_STORES + [FAKE_FACULTY_PATH]:
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    sections[path] = f.read()
+    sections["assignments.faculty"] = json.dumps(table.faculty_names, ensure_ascii=False).encode("utf-8")
+    sections["assignments.shifts"] = json.dumps(table.shift_labels, ensure_ascii=False).encode("utf-8")
+    sections["assignments.raw_dates"] = json.dumps(table.raw_dates, ensure_ascii=False).encode("utf-8")
+    for name, _ in SNAPSHOT_COLUMNS:
+        sections[f"assignments.{name}"] = column_bytes(getattr(table, name))
+    sections["meta"] = json.dumps({
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "assignments": len(table),
+        "faculty": len(table.faculty_names),
+    }).encode("utf-8")
+
+    names = [name.encode("utf-8") for name in sections]
+    directory_size = sum(1 + len(name) + SNAPSHOT_ENTRY.size for name in names)
+    offset = SNAPSHOT_HEADER.size + directory_size
+    directory, payloads = [], []
+    for name, raw in zip(names, sections.values()):
+        codec = SNAPSHOT_ZLIB if compress else SNAPSHOT_RAW
+        stored = zlib.compress(raw, 6) if compress else raw
+        directory.append(bytes([len(name)]) + name + SNAPSHOT_ENTRY.pack(codec, offset, len(stored), len(raw), zlib.crc32(raw)))
+        payloads.append(stored)
+        offset += len(stored)
+    return b"".join([SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(names))] + directory + payloads)
+
+class SnapshotReader:
+    # Memory-mapped view of a snapshot file; sections are decompressed and checked on first access
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError("Snapshot file is empty")
+        try:
+            self.directory = self.read_directory()
+        except Exception:
+            self.close()
+            raise
+
+    def read_directory(self):
+        if len(self.map) < SNAPSHOT_HEADER.size:
+            raise ValueError("Not a faculty duty snapshot")
+        magic, version, count = SNAPSHOT_HEADER.unpack_from(self.map, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a faculty duty snapshot")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {version} is newer than supported version {SNAPSHOT_VERSION}")
+        self.version = version
+        directory = {}
+        position = SNAPSHOT_HEADER.size
+        for _ in range(count):
+            length = self.map[position]
+            name = self.map[position + 1:position + 1 + length].decode("utf-8")
+            position += 1 + length
+            codec, offset, stored, raw, crc = SNAPSHOT_ENTRY.unpack_from(self.map, position)
+            position += SNAPSHOT_ENTRY.size
+            if offset + stored > len(self.map):
+                raise ValueError(f"Snapshot section '{name}' is truncated")
+            directory[name] = (codec, offset, stored, raw, crc)
+        return directory
+
+    def __contains__(self, name):
+        return name in self.directory
+
+    def section(self, name):
+        codec, offset, stored, raw_length, crc = self.directory[name]
+        data = self.map[offset:offset + stored]
+        if codec == SNAPSHOT_ZLIB:
+            data = zlib.decompress(data)
+        elif codec != SNAPSHOT_RAW:
+            raise ValueError(f"Unknown codec {codec} for snapshot section '{name}'")
+        if len(data) != raw_length or zlib.crc32(data) != crc:
+            raise ValueError(f"Snapshot section '{name}' is corrupt")
+        return data
+
+    def assignment_table(self):
+        table = AssignmentTable()
+        table.faculty_names = json.loads(self.section("assignments.faculty"))
+        table.faculty_index = {name: i for i, name in enumerate(table.faculty_names)}
+        table.shift_labels = json.loads(self.section("assignments.shifts"))
+        table.shift_index = {label: code for code, label in enumerate(table.shift_labels)}
+        table.raw_dates = {int(row): value for row, value in json.loads(self.section("assignments.raw_dates")).items()}
+        for name, typecode in SNAPSHOT_COLUMNS:
+            setattr(table, name, column_from_bytes(typecode, self.section(f"assignments.{name}")))
+        if not len(table.faculty_ids) == len(table.date_ordinals) == len(table.shift_codes):
+            raise ValueError("Snapshot assignment columns have different lengths")
+        return table
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def restore_snapshot(path):
+    with SnapshotReader(path) as snapshot:
+        # Decode and verify everything before touching the live files; the checksums cover the stored JSON
+        table = snapshot.assignment_table()
+        files = {store_path: snapshot.section(store_path) for store_path in SNAPSHOT_JSON_STORES + [FAKE_FACULTY_PATH]
+                 if store_path in snapshot}
+        meta = json.loads(snapshot.section("meta")) if "meta" in snapshot else {}
+    assignments = table.to_json().encode("utf-8")
+    # The files are written as stored rather than through save_json_store: no per-row delta is computed and
+    # the decoded table goes straight into the cache. Calendar feeds and the substitute index notice the new
+    # file signatures and rebuild on their next use, and clients are told to re-fetch everything.
+    with store_lock():
+        for store_path in SNAPSHOT_JSON_STORES + [FAKE_FACULTY_PATH]:
+            if store_path in files:
+                write_file_atomic(store_path, lambda f: f.write(files[store_path]))
+            elif os.path.exists(store_path):
+                os.remove(store_path)
+        write_file_atomic(ASSIGNMENTS_PATH, lambda f: f.write(assignments))
+        cache_assignment_table(table)
+        publish_change("resync", {"stores": sorted(LIVE_STORES.values())})
+    return {"assignments": len(table), "files": [ASSIGNMENTS_PATH] + list(files), "created": meta.get("created")}
+
+# Streaming Upload Ingestion
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.date().isoformat()
+    return str(value)
+
+class UploadRows:
+    # Iterable of (row_number, {column: value}); close() releases the workbook or spool wrapper whether or not
+    # iteration ever started (closing an unstarted generator would skip its finally)
+    def __init__(self, rows, release):
+        self.rows = rows
+        self.release = release
+
+    def __iter__(self):
+        try:
+            yield from self.rows
+        finally:
+            self.close()
+
+    def close(self):
+        release, self.release = self.release, None
+        if release is not None:
+            release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_upload_rows(upload):
+    # Returns (columns, rows) where rows lazily yields (row_number, {column: value}) straight from the upload spool
+    filename = (upload.filename or "").lower()
+    upload.file.seek(0)
+    if filename.endswith('.csv'):
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", errors="replace", newline="")
+        reader = csv.reader(stream)
+        columns = [c.strip() for c in next(reader, [])]
+
+        def csv_rows():
+            for row_number, values in enumerate(reader, start=2):
+                if not any(v.strip() for v in values):
+                    continue
+                yield row_number, {col: (values[i] if i < len(values) else "") for i, col in enumerate(columns)}
+        return columns, UploadRows(csv_rows(), stream.detach)
+    if filename.endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+        sheet_rows = workbook.active.iter_rows(values_only=True)
+        columns = [cell_text(c).strip() for c in next(sheet_rows, ())]
+
+        def xlsx_rows():
+            for row_number, values in enumerate(sheet_rows, start=2):
+                if all(cell_text(v).strip() == "" for v in values):
+                    continue
+                yield row_number, {col: (values[i] if i < len(values) and values[i] is not None else "") for i, col in enumerate(columns) if col}
+        return columns, UploadRows(xlsx_rows(), workbook.close)
+    raise ValueError("Unsupported file type")
+
+def validate_faculty_row(row, seen_names):
+    # -> (error, warnings); only an error drops the row, warnings are kept for the upload response
+    name = cell_text(row.get('faculty') or row.get('Faculty')).strip()
+    if not name:
+        return "Missing faculty name", []
+    if name in seen_names:
+        return f"Duplicate faculty '{name}'", []
+    warnings = []
+    max_duties = cell_text(row.get('Max Duties')).strip()
+    if max_duties:
+        try:
+            value = float(max_duties)
+        except ValueError:
+            value = -1.0
+        if value < 0 or not value.is_integer():
+            warnings.append(f"Max Duties should be a whole number >= 0, got '{max_duties}'")
+    email = cell_text(row.get('Email Id') or row.get('Email ID') or row.get('email')).strip()
+    if email and '@' not in email:
+        warnings.append(f"Invalid email '{email}'")
+    return None, warnings
+
+def parse_count(value):
+    text = cell_text(value).strip()
+    if not text:
+        return 0
+    try:
+        return int(float(text))
+    except ValueError:
+        return 0
+
 @app.get("/ping")
 def ping():
     return {"message": "pong"}
 
+@app.get("/startup-metrics")
+def get_startup_metrics():
+    return startup_metrics
+
 @app.get("/faculty")
 def get_faculty():
+    import pandas as pd
     if os.path.exists(FAKE_FACULTY_PATH):
         df = pd.read_csv(FAKE_FACULTY_PATH)
         return df.to_dict(orient="records")
     return []
 
+# Timetable Import
+# A timetable file lists date ranges with per-shift head counts; rows with a single date override whatever the
+# ranges produce for that day (a 0/0 override drops the day). Ranges are expanded with numpy, so a full
+# semester costs a few array operations rather than one request per day.
+WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+TIMETABLE_DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y"]
+
+def parse_timetable_date(value):
+    ordinal = parse_date_ordinal(value)
+    if ordinal:
+        return ordinal
+    text = cell_text(value).strip()
+    for fmt in TIMETABLE_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date().toordinal()
+        except ValueError:
+            continue
+    return 0
+
+def parse_head_count(value, column):
+    text = cell_text(value).strip()
+    if not text:
+        return 0
+    try:
+        count = float(text)
+    except ValueError:
+        raise ValueError(f"{column} must be a whole number >= 0, got '{text}'")
+    if count < 0 or not count.is_integer():
+        raise ValueError(f"{column} must be a whole number >= 0, got '{text}'")
+    return int(count)
+
+def parse_skip_weekdays(text):
+    weekdays = set()
+    for part in (text or "").split(","):
+        name = part.strip().lower()
+        if not name:
+            continue
+        matches = [i for i, weekday in enumerate(WEEKDAY_NAMES) if weekday.startswith(name[:3])]
+        if len(name) < 3 or not matches:
+            raise ValueError(f"Unknown weekday '{part.strip()}'")
+        weekdays.add(matches[0])
+    return weekdays
+
+def read_timetable_rows(rows):
+    # -> (ranges, overrides, errors); ranges are (start, end, first_half, second_half) ordinals/counts
+    ranges, overrides, errors = [], [], []
+    for row_number, row in rows:
+        row = {str(key).strip().lower().replace(" ", "_"): value for key, value in row.items()}
+        start_text = cell_text(row.get("start_date") or row.get("date")).strip()
+        end_text = cell_text(row.get("end_date")).strip()
+        try:
+            start = parse_timetable_date(start_text)
+            if not start:
+                raise ValueError(f"Invalid or missing date '{start_text}'")
+            end = parse_timetable_date(end_text) if end_text else start
+            if not end:
+                raise ValueError(f"Invalid end_date '{end_text}'")
+            if end < start:
+                raise ValueError("end_date is before start_date")
+            counts = (parse_head_count(row.get("first_half"), "first_half"),
+                      parse_head_count(row.get("second_half"), "second_half"))
+        except ValueError as e:
+            errors.append({"row": row_number, "message": str(e)})
+            continue
+        if end_text and end != start:
+            ranges.append((start, end) + counts)
+        else:
+            overrides.append((start, start) + counts)
+    return ranges, overrides, errors
+
+def expand_timetable(ranges, overrides, skip_weekdays=(), holidays=()):
+    # Later rows win over earlier ones; overrides win over ranges and are not subject to the skip rules
+    import numpy as np
+    import pandas as pd
+
+    def expand(rows):
+        if not rows:
+            return pd.DataFrame({"ordinal": [], "first_half": [], "second_half": []}, dtype="int64")
+        spec = np.array(rows, dtype=np.int64)
+        lengths = spec[:, 1] - spec[:, 0] + 1
+        row_of_day = np.repeat(np.arange(len(spec)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return pd.DataFrame({
+            "ordinal": spec[row_of_day, 0] + offsets,
+            "first_half": spec[row_of_day, 2],
+            "second_half": spec[row_of_day, 3],
+        })
+
+    days = expand(ranges)
+    keep = ~((days["ordinal"] - 1) % 7).isin(list(skip_weekdays)) & ~days["ordinal"].isin(list(holidays))
+    days = pd.concat([days[keep], expand(overrides)], ignore_index=True)
+    days = days.drop_duplicates("ordinal", keep="last")
+    days = days[(days["first_half"] > 0) | (days["second_half"] > 0)].sort_values("ordinal")
+    dates = (days["ordinal"].to_numpy() - UNIX_EPOCH_ORDINAL).astype("datetime64[D]").astype(str)
+    return [
+        {"date": date, "first_half": int(first_half), "second_half": int(second_half)}
+        for date, first_half, second_half in zip(dates, days["first_half"].to_numpy(), days["second_half"].to_numpy())
+    ]
+
 @app.post("/upload-faculty")
 def upload_faculty(file: UploadFile = File(...)):
-    filename = file.filename
-    temp_path = "temp_upload"
-    with open(temp_path, "wb") as f:
-        f.write(file.file.read())
     try:
-        if filename.endswith('.xlsx'):
-            df = pd.read_excel(temp_path)
-        elif filename.endswith('.csv'):
-            df = pd.read_csv(temp_path, encoding='utf-8', errors='replace')
-        else:
-            os.remove(temp_path)
-            return {"status": "error", "message": "Unsupported file type"}
-        df.to_csv("faculty_upload.csv", index=False)
-    except Exception as e:
-        os.remove(temp_path)
+        columns, rows = open_upload_rows(file)
+    except ValueError as e:
         return {"status": "error", "message": str(e)}
-    os.remove(temp_path)
-    return {"status": "ok"}
+    except Exception as e:
+        return {"status": "error", "message": f"Could not read upload: {e}"}
+    if 'faculty' not in columns and 'Faculty' not in columns:
+        rows.close()
+        return {"status": "error", "message": "Missing required column: faculty"}
+    columns = [c for c in columns if c]
+    errors, warnings = [], []
+    seen_names = set()
+    target_dir = os.path.dirname(os.path.abspath(FAKE_FACULTY_PATH))
+    # Rows are validated and written as they are parsed; the file only replaces faculty_upload.csv once complete
+    out = tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="", dir=target_dir, suffix=".csv.tmp", delete=False)
+    try:
+        with out, rows:
+            writer = csv.writer(out)
+            writer.writerow(columns)
+            for row_number, row in rows:
+                error, row_warnings = validate_faculty_row(row, seen_names)
+                warnings += [{"row": row_number, "message": warning} for warning in row_warnings]
+                if error:
+                    errors.append({"row": row_number, "message": error})
+                    continue
+                seen_names.add(cell_text(row.get('faculty') or row.get('Faculty')).strip())
+                writer.writerow([cell_text(row.get(col)) for col in columns])
+        if not seen_names:
+            os.remove(out.name)
+            return {"status": "error", "message": "No valid faculty rows found", "errors": errors, "warnings": warnings}
+        with store_lock():
+            replace_file(out.name, FAKE_FACULTY_PATH)
+    except Exception as e:
+        if os.path.exists(out.name):
+            os.remove(out.name)
+        return {"status": "error", "message": str(e), "errors": errors, "warnings": warnings}
+    duplicates = get_faculty_name_index().duplicate_groups()
+    return {"status": "ok", "rows": len(seen_names), "errors": errors, "warnings": warnings, "possible_duplicates": duplicates}
+
+@app.post("/resolve-faculty-names")
+def resolve_faculty_names(data: dict):
+    index = get_faculty_name_index()
+    results = []
+    for name in data.get("names", []):
+        match = index.resolve(str(name))
+        results.append({"query": name, "resolved": match.name, "status": match.status,
+                        "score": match.score, "candidates": match.candidates})
+    return results
 
 @app.get("/exam-schedule")
 def get_exam_schedule():
@@ -590,32 +2868,77 @@ def get_exam_schedule():
 
 @app.post("/exam-schedule")
 def add_exam_schedule(item: dict):
-    schedule = []
-    if os.path.exists(EXAM_SCHEDULE_PATH):
-        with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
-            schedule = json.load(f)
-    schedule.append(item)
-    with open(EXAM_SCHEDULE_PATH, "w", encoding="utf-8") as f:
-        json.dump(schedule, f, ensure_ascii=False)
+    with store_lock():
+        schedule = []
+        if os.path.exists(EXAM_SCHEDULE_PATH):
+            with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
+                schedule = json.load(f)
+        schedule.append(item)
+        save_json_store(EXAM_SCHEDULE_PATH, schedule)
     return {"status": "ok"}
 
 @app.delete("/exam-schedule/{date}")
 def delete_exam_schedule(date: str):
-    if not os.path.exists(EXAM_SCHEDULE_PATH):
-        return {"status": "ok"}
-    with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
-        schedule = json.load(f)
-    # Remove by date (string match)
-    schedule = [item for item in schedule if str(item.get('date')) != date]
-    with open(EXAM_SCHEDULE_PATH, "w", encoding="utf-8") as f:
-        json.dump(schedule, f, ensure_ascii=False)
+    with store_lock():
+        if not os.path.exists(EXAM_SCHEDULE_PATH):
+            return {"status": "ok"}
+        with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
+            schedule = json.load(f)
+        # Remove by date (string match)
+        schedule = [item for item in schedule if str(item.get('date')) != date]
+        save_json_store(EXAM_SCHEDULE_PATH, schedule)
     return {"status": "ok"}
 
+@app.post("/exam-schedule/import")
+def import_exam_schedule(file: UploadFile = File(...), mode: str = Form("replace"), skip_weekdays: str = Form("Sunday"), holidays: str = Form("")):
+    if mode not in ("replace", "merge"):
+        return {"status": "error", "message": "mode must be 'replace' or 'merge'"}
+    try:
+        skipped = parse_skip_weekdays(skip_weekdays)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    holiday_ordinals = set()
+    for holiday in holidays.split(","):
+        if holiday.strip():
+            ordinal = parse_timetable_date(holiday.strip())
+            if not ordinal:
+                return {"status": "error", "message": f"Invalid holiday date '{holiday.strip()}'"}
+            holiday_ordinals.add(ordinal)
+    try:
+        columns, rows = open_upload_rows(file)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        return {"status": "error", "message": f"Could not read upload: {e}"}
+    normalized = {c.strip().lower().replace(" ", "_") for c in columns}
+    if not normalized & {"start_date", "date"}:
+        rows.close()
+        return {"status": "error", "message": "Missing required column: start_date (or date)"}
+    with rows:
+        ranges, overrides, errors = read_timetable_rows(rows)
+    imported = expand_timetable(ranges, overrides, skipped, holiday_ordinals)
+    if not imported and not overrides:
+        return {"status": "error", "message": "No valid timetable rows found", "errors": errors}
+    with store_lock():
+        schedule = []
+        if mode == "merge" and os.path.exists(EXAM_SCHEDULE_PATH):
+            with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
+                schedule = json.load(f)
+            # Imported days replace existing entries for the same date; 0/0 overrides remove them
+            touched = {item["date"] for item in imported}
+            touched.update(datetime.date.fromordinal(start).isoformat() for start, _, _, _ in overrides)
+            schedule = [item for item in schedule if str(item.get('date'))[:10] not in touched]
+        schedule = sorted(schedule + imported, key=lambda item: str(item.get('date')))
+        save_json_store(EXAM_SCHEDULE_PATH, schedule)
+    return {"status": "ok", "mode": mode, "days": len(imported), "total_days": len(schedule), "errors": errors}
+
 @app.post("/generate-assignments")
 def generate_assignments(data: dict):
-    # For demo: just assign first faculty to each slot
     faculty = data.get("faculty", [])
     schedule = data.get("schedule", [])
+    if data.get("mode") == "random":
+        return generate_random_assignments(data, faculty, schedule)
+    # For demo: just assign first faculty to each slot
     assignments = []
     faculty_names = [f.get("faculty") or f.get("Faculty") for f in faculty]
     idx = 0
@@ -631,58 +2954,128 @@ def generate_assignments(data: dict):
                     })
                     idx += 1
     # Save assignments for report generation
-    with open(ASSIGNMENTS_PATH, "w", encoding="utf-8") as f:
-        json.dump(assignments, f, ensure_ascii=False)
+    save_json_store(ASSIGNMENTS_PATH, assignments)
     return assignments
 
+def generate_random_assignments(data, faculty, schedule):
+    import random
+    try:
+        seed = int(data["seed"]) if data.get("seed") is not None else random.SystemRandom().randrange(2 ** 31)
+        time_budget = float(data.get("time_budget", RANDOM_TIME_BUDGET))
+        restarts = int(data["restarts"]) if data.get("restarts") else None
+        workers = int(data["workers"]) if data.get("workers") else None
+    except (TypeError, ValueError):
+        return JSONResponse(status_code=400, content={"error": "seed, restarts and workers must be integers and time_budget a number"})
+    faculty_names, faculty_caps = [], []
+    for entry in faculty:
+        name = entry.get("faculty") or entry.get("Faculty")
+        if not name or name in faculty_names:
+            continue
+        try:
+            cap = int(float(entry.get("Max Duties")))
+        except (TypeError, ValueError):
+            cap = None
+        faculty_names.append(name)
+        faculty_caps.append(cap)
+    unavailability = {}
+    if os.path.exists(FACULTY_UNAVAILABILITY_PATH):
+        with open(FACULTY_UNAVAILABILITY_PATH, "r", encoding="utf-8") as f:
+            unavailability = json.load(f)
+    # Unavailability may be keyed by a different spelling of the faculty name
+    name_index = FacultyNameIndex(faculty_names)
+    unavailability = {name_index.canonical(name): shifts for name, shifts in unavailability.items()}
+    if not faculty_names:
+        assignments, stats = [], {"seed": seed}
+    else:
+        assignments, stats = randomized_assignments(faculty_names, faculty_caps, schedule, unavailability,
+                                                    seed, time_budget, restarts, workers)
+    print(f"Randomized assignment: {stats}")
+    save_json_store(ASSIGNMENTS_PATH, assignments)
+    return JSONResponse(content=assignments, headers={
+        "X-Assignment-Seed": str(seed),
+        "X-Fairness-Score": str(stats.get("score", "")),
+        "X-Assignment-Restarts": str(stats.get("restarts", 0)),
+    })
+
+REPORT_FORMATS = {
+    # type -> (label, media type, download filename)
+    "excel": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "faculty_summary.xlsx"),
+    "word": ("Word", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "faculty_duty_assignment.docx"),
+    "pdf": ("PDF", "application/pdf", "faculty_duty_assignment.pdf"),
+    "analytics": ("Analytics", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "faculty_duty_analytics.xlsx"),
+}
+
+def build_report(report_type, df, unavailability):
+    if report_type == "excel":
+        return generate_faculty_summary_excel(df, unavailability)
+    if report_type == "analytics":
+        schedule = []
+        if os.path.exists(EXAM_SCHEDULE_PATH):
+            with open(EXAM_SCHEDULE_PATH, "r", encoding="utf-8") as f:
+                schedule = json.load(f)
+        return generate_analytics_excel(df, unavailability, schedule)
+    if report_type == "word":
+        return generate_word_doc(df)
+    if report_type == "pdf":
+        return generate_pdf_report(df)
+    return None
+
 @app.get("/download-report")
 def download_report(type: str):
     try:
         # Load assignments
         if not os.path.exists(ASSIGNMENTS_PATH):
             return JSONResponse(status_code=404, content={"error": "No assignments found"})
-        with open(ASSIGNMENTS_PATH, "r", encoding="utf-8") as f:
-            assignments = json.load(f)
-        df = pd.DataFrame(assignments)
-        
+        if type not in REPORT_FORMATS:
+            return JSONResponse(status_code=400, content={"error": "Invalid report type"})
+        label, media_type, filename = REPORT_FORMATS[type]
         print(f"Download report requested for type: {type}")
-        print(f"Assignments data shape: {df.shape}")
-        print(f"Assignments columns: {df.columns.tolist()}")
         
-        # Load faculty unavailability for Excel report
-        unavailability = {}
-        if os.path.exists(FACULTY_UNAVAILABILITY_PATH):
-            with open(FACULTY_UNAVAILABILITY_PATH, "r", encoding="utf-8") as f:
-                unavailability = json.load(f)
-
-        if type == "excel":
-            print("Generating Excel report...")
-            excel_data = generate_faculty_summary_excel(df, unavailability)
-            if excel_data:
-                print("Excel report generated successfully")
-                return StreamingResponse(
-                    BytesIO(excel_data),
-                    media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    headers={"Content-Disposition": "attachment; filename=faculty_summary.xlsx"}
-                )
-            else:
-                print("Failed to generate Excel report")
-                return JSONResponse(status_code=500, content={"error": "Failed to generate Excel report"})
-        elif type == "word":
-            print("Generating Word report...")
-            word_data = generate_word_doc(df)
-            if word_data:
-                print("Word report generated successfully")
-                return StreamingResponse(
-                    BytesIO(word_data),
-                    media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    headers={"Content-Disposition": "attachment; filename=faculty_duty_assignment.docx"}
-                )
-            else:
-                print("Failed to generate Word report")
-                return JSONResponse(status_code=500, content={"error": "Failed to generate Word report"})
+        # Any worker may have built this exact report already; the key changes whenever an input file does
+        cache_path = report_cache_path(type)
+        table = get_assignment_table()
+        # Validation is advisory here: a malformed schedule or unavailability file must not block downloads
+        try:
+            violations = validate_current_assignments(table)
+        except Exception as e:
+            print(f"Warning: could not validate assignments before the report: {e}")
+            violations = None
+        if violations:
+            print(f"Warning: generating report with {len(violations)} assignment violations")
+        
+        report_data = read_cached_report(cache_path)
+        if report_data:
+            print(f"Serving cached {label} report")
         else:
-            return JSONResponse(status_code=400, content={"error": "Invalid report type"})
+            df = table.to_dataframe()
+            # Join on the faculty list's spelling so contacts and per-faculty rows line up
+            name_index = get_faculty_name_index()
+            canonical = {name: name_index.canonical(name) for name in table.faculty_names}
+            if any(name != resolved for name, resolved in canonical.items()):
+                df["faculty"] = df["faculty"].map(canonical)
+            print(f"Assignments data shape: {df.shape}")
+            print(f"Assignments columns: {df.columns.tolist()}")
+            
+            # Load faculty unavailability for Excel report
+            unavailability = {}
+            if os.path.exists(FACULTY_UNAVAILABILITY_PATH):
+                with open(FACULTY_UNAVAILABILITY_PATH, "r", encoding="utf-8") as f:
+                    unavailability = json.load(f)
+            
+            print(f"Generating {label} report...")
+            report_data = build_report(type, df, unavailability)
+            if not report_data:
+                print(f"Failed to generate {label} report")
+                return JSONResponse(status_code=500, content={"error": f"Failed to generate {label} report"})
+            store_cached_report(type, report_data, cache_path)
+            print(f"{label} report generated successfully")
+        
+        return StreamingResponse(
+            BytesIO(report_data),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename={filename}",
+                     "X-Assignment-Violations": str(len(violations)) if violations is not None else "unknown"}
+        )
     except Exception as e:
         print(f"Error in download_report: {str(e)}")
         import traceback
@@ -697,11 +3090,105 @@ def get_assignments():
     return []
 
 @app.post("/assignments")
-async def save_assignments(request: Request):
-    assignments = await request.json()
-    with open(ASSIGNMENTS_PATH, "w", encoding="utf-8") as f:
-        json.dump(assignments, f, ensure_ascii=False)
-    return {"status": "ok"}
+def save_assignments(assignments: Any = Body(...)):
+    error = assignment_payload_error(assignments)
+    if error:
+        return JSONResponse(status_code=400, content={"error": error})
+    save_json_store(ASSIGNMENTS_PATH, assignments)
+    try:
+        violations = validate_current_assignments()
+    except Exception as e:
+        # The assignments are already saved; report the validation problem instead of failing the save
+        print(f"Warning: could not validate saved assignments: {e}")
+        return {"status": "ok", "violations": None, "validation_error": str(e)}
+    if violations:
+        print(f"Saved assignments with {len(violations)} violations")
+    return {"status": "ok", "violations": violations}
+
+@app.get("/validate-assignments")
+def get_assignment_violations():
+    violations = validate_current_assignments()
+    return {"valid": not violations, "count": len(violations), "violations": violations}
+
+@app.get("/substitutes")
+def find_substitutes(date: str, shift: str, limit: int = 10):
+    ordinal = parse_date_ordinal(date)
+    if not ordinal:
+        return JSONResponse(status_code=400, content={"error": f"Invalid date '{date}'"})
+    labels = {label.lower(): code for code, label in enumerate(SHIFT_LABELS)}
+    labels.update({key: SHIFT_LABELS.index(label) for label, key in SHIFT_KEYS.items()})
+    code = labels.get(shift.strip().lower())
+    if code is None:
+        return JSONResponse(status_code=400, content={"error": f"Invalid shift '{shift}'"})
+    index = get_substitute_index()
+    return {
+        "date": datetime.date.fromordinal(ordinal).isoformat(),
+        "shift": SHIFT_LABELS[code],
+        "assigned": index.assigned(ordinal, code),
+        "substitutes": index.find(ordinal, code, max(limit, 0)),
+    }
+
+@app.post("/notifications/duty-emails")
+async def send_duty_emails(request: Request):
+    try:
+        data = await request.json() if await request.body() else {}
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Request body must be JSON"})
+    if not isinstance(data, dict):
+        return JSONResponse(status_code=400, content={"error": "Expected an object with optional 'faculty', 'dry_run'"})
+    only = data.get("faculty")
+    if only is not None and not (isinstance(only, list) and all(isinstance(name, str) for name in only)):
+        return JSONResponse(status_code=400, content={"error": "'faculty' must be a list of names"})
+    # Reading the roster and rendering every message is blocking work; keep it off the event loop
+    messages, skipped = await asyncio.to_thread(build_duty_emails, only)
+    if data.get("dry_run"):
+        return {"status": "dry_run", "messages": len(messages), "skipped": skipped,
+                "preview": [{"faculty": faculty, "email": email, "subject": message["Subject"], "body": message.get_content()}
+                            for faculty, email, message in messages[:3]]}
+    job_id = f"{datetime.datetime.now():%Y%m%d%H%M%S}-{os.urandom(3).hex()}"
+    job = {"id": job_id, "status": "sending", "total": len(messages), "sent": 0, "failed": 0,
+           "skipped": len(skipped), "started": datetime.datetime.now().isoformat(timespec="seconds")}
+    _notification_jobs[job_id] = job
+    job["task"] = asyncio.ensure_future(run_notification_job(job, messages))
+    return {"status": "queued", "job": job_id, "messages": len(messages), "skipped": skipped}
+
+@app.get("/notifications/jobs/{job_id}")
+def get_notification_job(job_id: str):
+    job = _notification_jobs.get(job_id)
+    if job is None:
+        # Started by another worker: rebuild the counts from the shared send log
+        entries = read_notification_log(job_id)
+        if not entries:
+            return JSONResponse(status_code=404, content={"error": "Unknown notification job"})
+        counts = collections.Counter(entry["status"] for entry in entries)
+        return {"id": job_id, "status": "unknown", "sent": counts["sent"], "failed": counts["failed"]}
+    return {key: value for key, value in job.items() if key != "task"}
+
+@app.get("/notifications/log")
+def get_notification_log(job: str = None):
+    return read_notification_log(job)
+
+@app.get("/snapshot")
+def export_snapshot(compress: bool = True):
+    data = build_snapshot(compress)
+    filename = f"faculty_duty_snapshot_{datetime.datetime.now():%Y%m%d_%H%M%S}.fds"
+    return Response(content=data, media_type="application/octet-stream",
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+@app.post("/snapshot")
+def import_snapshot(file: UploadFile = File(...)):
+    # Spool to disk so the reader can memory-map it
+    os.makedirs(STATE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=STATE_DIR, prefix=".snapshot-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(file.file, out, 1024 * 1024)
+        restored = restore_snapshot(temp_path)
+    except (ValueError, KeyError, IndexError, struct.error, zlib.error) as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid snapshot: {e}"})
+    finally:
+        os.remove(temp_path)
+    return {"status": "ok", **restored}
 
 @app.get("/faculty-groups")
 def get_faculty_groups():
@@ -711,10 +3198,8 @@ def get_faculty_groups():
     return []
 
 @app.post("/faculty-groups")
-async def save_faculty_groups(request: Request):
-    groups = await request.json()
-    with open(FACULTY_GROUPS_PATH, "w", encoding="utf-8") as f:
-        json.dump(groups, f, ensure_ascii=False)
+def save_faculty_groups(groups: Any = Body(...)):
+    save_json_store(FACULTY_GROUPS_PATH, groups)
     return {"status": "ok"}
 
 @app.get("/faculty-unavailability")
@@ -725,10 +3210,8 @@ def get_faculty_unavailability():
     return {}
 
 @app.post("/faculty-unavailability")
-async def save_faculty_unavailability(request: Request):
-    unavailability = await request.json()
-    with open(FACULTY_UNAVAILABILITY_PATH, "w", encoding="utf-8") as f:
-        json.dump(unavailability, f, ensure_ascii=False)
+def save_faculty_unavailability(unavailability: Any = Body(...)):
+    save_json_store(FACULTY_UNAVAILABILITY_PATH, unavailability)
     return {"status": "ok"}
 
 @app.get("/exam-config")
@@ -745,14 +3228,28 @@ def get_exam_config():
     }
 
 @app.post("/exam-config")
-async def save_exam_config(request: Request):
-    config = await request.json()
-    with open(EXAM_CONFIG_PATH, "w", encoding="utf-8") as f:
-        json.dump(config, f, ensure_ascii=False)
+def save_exam_config(config: Any = Body(...)):
+    save_json_store(EXAM_CONFIG_PATH, config)
     return {"status": "ok"}
 
+@app.get("/report-templates")
+def get_report_templates():
+    return {"default": DEFAULT_REPORT_TEMPLATE, "templates": load_report_templates()}
+
+@app.post("/report-templates")
+def save_report_templates(templates: Any = Body(...)):
+    if not isinstance(templates, dict):
+        return JSONResponse(status_code=400, content={"error": "Expected an object mapping department names to templates"})
+    errors = {name: problems for name, template in templates.items() if (problems := validate_report_template(template))}
+    if errors:
+        return JSONResponse(status_code=400, content={"error": "Invalid report template", "details": errors})
+    save_json_store(REPORT_TEMPLATES_PATH, templates)
+    return {"status": "ok", "templates": len(templates)}
+
 @app.post("/regenerate-from-summary")
-async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule_file: UploadFile = File(None), unavailability_file: UploadFile = File(None)):
+def regenerate_from_summary(summary_file: UploadFile = File(...), schedule_file: UploadFile = File(None), unavailability_file: UploadFile = File(None)):
+    import pandas as pd
+    summary_rows = schedule_rows = unavailability_rows = None
     try:
         print(f"Starting regeneration process...")
         print(f"Summary file: {summary_file.filename if summary_file else 'None'}")
@@ -762,41 +3259,36 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
         if not summary_file.filename.endswith('.xlsx'):
             return JSONResponse(status_code=400, content={"error": "Please upload an Excel file (.xlsx) for faculty summary"})
         
-        # Save uploaded summary file temporarily
-        temp_summary_path = "temp_summary.xlsx"
-        summary_content = summary_file.file.read()
-        with open(temp_summary_path, "wb") as f:
-            f.write(summary_content)
+        row_errors = []  # per-row problems reported back to the client
+        # Sheet names are mapped onto the uploaded faculty list once per distinct name
+        name_index = get_faculty_name_index()
+        uploaded_names = []
+        
+        def row_error(source, row_number, message):
+            print(f"Warning: {source} row {row_number}: {message}")
+            row_errors.append({"file": source, "row": row_number, "message": message})
         
-        # Read the summary Excel file
-        summary_df = pd.read_excel(temp_summary_path, engine="openpyxl")
-        print(f"Summary file loaded with shape: {summary_df.shape}")
-        print(f"Summary columns: {summary_df.columns.tolist()}")
+        # Read the summary workbook in read-only mode straight from the upload spool
+        summary_columns, summary_rows = open_upload_rows(summary_file)
+        print(f"Summary columns: {summary_columns}")
         
         # Validate required columns for summary
         required_columns = ['Faculty', 'First Half Duties', 'Second Half Duties', 'First Half Dates', 'Second Half Dates']
-        missing_columns = [col for col in required_columns if col not in summary_df.columns]
+        missing_columns = [col for col in required_columns if col not in summary_columns]
         if missing_columns:
-            os.remove(temp_summary_path)
             return JSONResponse(status_code=400, content={"error": f"Missing required columns in faculty summary: {missing_columns}"})
         
         # Process exam schedule file if provided
         new_schedule = []
         if schedule_file and schedule_file.filename.endswith('.xlsx'):
-            temp_schedule_path = "temp_schedule.xlsx"
-            schedule_content = schedule_file.file.read()
-            with open(temp_schedule_path, "wb") as f:
-                f.write(schedule_content)
-            
             try:
-                schedule_df = pd.read_excel(temp_schedule_path, engine="openpyxl")
+                schedule_columns, schedule_rows = open_upload_rows(schedule_file)
                 
                 # Validate schedule columns (expected: Date, First Half, Second Half)
-                schedule_columns = schedule_df.columns.tolist()
                 if 'Date' in schedule_columns:
-                    for _, row in schedule_df.iterrows():
-                        date_str = str(row['Date'])
-                        if date_str and date_str != 'nan':
+                    for row_number, row in schedule_rows:
+                        date_str = cell_text(row['Date']).strip()
+                        if date_str:
                             try:
                                 # Try to parse the date
                                 if '-' in date_str:
@@ -806,52 +3298,42 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
                                 
                                 new_schedule.append({
                                     "date": date_obj.strftime('%Y-%m-%d'),
-                                    "first_half": int(row.get('First Half', 0)) if pd.notna(row.get('First Half')) else 0,
-                                    "second_half": int(row.get('Second Half', 0)) if pd.notna(row.get('Second Half')) else 0
+                                    "first_half": parse_count(row.get('First Half')),
+                                    "second_half": parse_count(row.get('Second Half'))
                                 })
                             except (ValueError, TypeError) as e:
-                                print(f"Warning: Could not parse date '{date_str}' in schedule: {e}")
+                                row_error("schedule", row_number, f"Could not parse date '{date_str}': {e}")
                 
                 # Save new schedule if valid data was found
                 if new_schedule:
-                    with open(EXAM_SCHEDULE_PATH, "w", encoding="utf-8") as f:
-                        json.dump(new_schedule, f, ensure_ascii=False)
+                    save_json_store(EXAM_SCHEDULE_PATH, new_schedule)
                     print(f"Updated exam schedule with {len(new_schedule)} dates")
-                
-                os.remove(temp_schedule_path)
             except Exception as e:
                 print(f"Warning: Could not process schedule file: {e}")
-                if os.path.exists(temp_schedule_path):
-                    os.remove(temp_schedule_path)
         
         # Process faculty unavailability file if provided
         new_unavailability = {}
         if unavailability_file and unavailability_file.filename.endswith('.xlsx'):
-            temp_unavailability_path = "temp_unavailability.xlsx"
-            unavailability_content = unavailability_file.file.read()
-            with open(temp_unavailability_path, "wb") as f:
-                f.write(unavailability_content)
-            
             try:
-                unavailability_df = pd.read_excel(temp_unavailability_path, engine="openpyxl")
+                unavailability_columns, unavailability_rows = open_upload_rows(unavailability_file)
                 
                 # Expected format: Faculty, Date, Shift (First Half/Second Half)
                 # or Faculty, First Half Dates, Second Half Dates
-                unavailability_columns = unavailability_df.columns.tolist()
-                
                 if 'Faculty' in unavailability_columns:
-                    for _, row in unavailability_df.iterrows():
-                        faculty = str(row['Faculty'])
-                        if faculty and faculty != 'nan':
+                    for row_number, row in unavailability_rows:
+                        faculty = cell_text(row['Faculty'])
+                        if faculty.strip():
+                            uploaded_names.append(faculty)
+                            faculty = name_index.canonical(faculty)
                             if faculty not in new_unavailability:
                                 new_unavailability[faculty] = {'first_half': [], 'second_half': []}
                             
                             # Handle different possible formats
                             if 'Date' in unavailability_columns and 'Shift' in unavailability_columns:
                                 # Format: Faculty, Date, Shift
-                                date_str = str(row['Date'])
-                                shift = str(row['Shift'])
-                                if date_str and date_str != 'nan' and shift and shift != 'nan':
+                                date_str = cell_text(row['Date']).strip()
+                                shift = cell_text(row['Shift']).strip()
+                                if date_str and shift:
                                     try:
                                         if '-' in date_str:
                                             date_obj = pd.to_datetime(date_str).date()
@@ -866,15 +3348,15 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
                                             if date_formatted not in new_unavailability[faculty]['second_half']:
                                                 new_unavailability[faculty]['second_half'].append(date_formatted)
                                     except (ValueError, TypeError) as e:
-                                        print(f"Warning: Could not parse date '{date_str}' for faculty {faculty}: {e}")
+                                        row_error("unavailability", row_number, f"Could not parse date '{date_str}' for faculty {faculty}: {e}")
                             
                             elif 'First Half Dates' in unavailability_columns and 'Second Half Dates' in unavailability_columns:
                                 # Format: Faculty, First Half Dates, Second Half Dates
-                                fh_dates_str = str(row['First Half Dates'])
-                                sh_dates_str = str(row['Second Half Dates'])
+                                fh_dates_str = cell_text(row['First Half Dates'])
+                                sh_dates_str = cell_text(row['Second Half Dates'])
                                 
                                 # Process First Half dates
-                                if fh_dates_str and fh_dates_str != 'nan' and fh_dates_str != '':
+                                if fh_dates_str:
                                     fh_dates = [d.strip() for d in fh_dates_str.split(',') if d.strip()]
                                     for date_str in fh_dates:
                                         try:
@@ -883,10 +3365,10 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
                                             if date_formatted not in new_unavailability[faculty]['first_half']:
                                                 new_unavailability[faculty]['first_half'].append(date_formatted)
                                         except ValueError:
-                                            print(f"Warning: Could not parse first half date '{date_str}' for faculty {faculty}")
+                                            row_error("unavailability", row_number, f"Could not parse first half date '{date_str}' for faculty {faculty}")
                                 
                                 # Process Second Half dates
-                                if sh_dates_str and sh_dates_str != 'nan' and sh_dates_str != '':
+                                if sh_dates_str:
                                     sh_dates = [d.strip() for d in sh_dates_str.split(',') if d.strip()]
                                     for date_str in sh_dates:
                                         try:
@@ -895,60 +3377,54 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
                                             if date_formatted not in new_unavailability[faculty]['second_half']:
                                                 new_unavailability[faculty]['second_half'].append(date_formatted)
                                         except ValueError:
-                                            print(f"Warning: Could not parse second half date '{date_str}' for faculty {faculty}")
+                                            row_error("unavailability", row_number, f"Could not parse second half date '{date_str}' for faculty {faculty}")
                 
                 # Save new unavailability if valid data was found
                 if new_unavailability:
-                    with open(FACULTY_UNAVAILABILITY_PATH, "w", encoding="utf-8") as f:
-                        json.dump(new_unavailability, f, ensure_ascii=False)
+                    save_json_store(FACULTY_UNAVAILABILITY_PATH, new_unavailability)
                     print(f"Updated faculty unavailability for {len(new_unavailability)} faculty")
-                
-                os.remove(temp_unavailability_path)
             except Exception as e:
                 print(f"Warning: Could not process unavailability file: {e}")
-                if os.path.exists(temp_unavailability_path):
-                    os.remove(temp_unavailability_path)
         
-        # Generate new assignments from summary
+        # Generate new assignments from summary; unavailability columns are collected in the same pass
         new_assignments = []
         slot_counter = {}  # (date, shift) -> list of faculty
         all_dates_shifts = set()
-        for _, row in summary_df.iterrows():
-            faculty = row['Faculty']
-            # Process First Half dates
-            fh_dates_str = str(row['First Half Dates'])
-            if fh_dates_str and fh_dates_str != 'nan' and fh_dates_str != '':
-                fh_dates = [d.strip() for d in fh_dates_str.split(',') if d.strip()]
-                for date_str in fh_dates:
-                    try:
-                        date_obj = datetime.datetime.strptime(date_str, '%d-%m-%Y').date()
-                        date_key = date_obj.strftime('%Y-%m-%d')
-                        new_assignments.append({
-                            "date": date_key,
-                            "shift": "First Half",
-                            "faculty": faculty
-                        })
-                        all_dates_shifts.add((date_key, "First Half"))
-                        slot_counter.setdefault((date_key, "First Half"), []).append(faculty)
-                    except ValueError:
-                        print(f"Warning: Could not parse date '{date_str}' for faculty {faculty}")
-            # Process Second Half dates
-            sh_dates_str = str(row['Second Half Dates'])
-            if sh_dates_str and sh_dates_str != 'nan' and sh_dates_str != '':
-                sh_dates = [d.strip() for d in sh_dates_str.split(',') if d.strip()]
-                for date_str in sh_dates:
+        summary_unavailability = {}
+        for row_number, row in summary_rows:
+            faculty = cell_text(row['Faculty'])
+            if not faculty.strip():
+                row_error("summary", row_number, "Missing faculty name")
+                continue
+            uploaded_names.append(faculty)
+            faculty = name_index.canonical(faculty)
+            for shift, column in [("First Half", 'First Half Dates'), ("Second Half", 'Second Half Dates')]:
+                dates_str = cell_text(row[column])
+                for date_str in [d.strip() for d in dates_str.split(',') if d.strip()]:
                     try:
                         date_obj = datetime.datetime.strptime(date_str, '%d-%m-%Y').date()
                         date_key = date_obj.strftime('%Y-%m-%d')
                         new_assignments.append({
                             "date": date_key,
-                            "shift": "Second Half",
+                            "shift": shift,
                             "faculty": faculty
                         })
-                        all_dates_shifts.add((date_key, "Second Half"))
-                        slot_counter.setdefault((date_key, "Second Half"), []).append(faculty)
+                        all_dates_shifts.add((date_key, shift))
+                        slot_counter.setdefault((date_key, shift), []).append(faculty)
                     except ValueError:
-                        print(f"Warning: Could not parse date '{date_str}' for faculty {faculty}")
+                        row_error("summary", row_number, f"Could not parse date '{date_str}' for faculty {faculty}")
+            entry = summary_unavailability.setdefault(faculty, {'first_half': [], 'second_half': []})
+            for shift_key, column in [('first_half', 'First Half Unavailable'), ('second_half', 'Second Half Unavailable')]:
+                unavail_str = cell_text(row.get(column, ''))
+                if unavail_str and unavail_str != 'None':
+                    for date_str in [d.strip() for d in unavail_str.split(',') if d.strip()]:
+                        try:
+                            date_obj = datetime.datetime.strptime(date_str, '%d-%m-%Y').date()
+                            date_key = date_obj.strftime('%Y-%m-%d')
+                            if date_key not in entry[shift_key]:
+                                entry[shift_key].append(date_key)
+                        except ValueError:
+                            row_error("summary", row_number, f"Could not parse unavailable date '{date_str}' for faculty {faculty}")
         # Build schedule from summary
         new_schedule = []
         for (date, shift) in sorted(all_dates_shifts):
@@ -968,54 +3444,21 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
             merged_schedule[date]["second_half"] += item["second_half"]
         merged_schedule_list = list(merged_schedule.values())
         if merged_schedule_list:
-            with open(EXAM_SCHEDULE_PATH, "w", encoding="utf-8") as f:
-                json.dump(merged_schedule_list, f, ensure_ascii=False)
+            save_json_store(EXAM_SCHEDULE_PATH, merged_schedule_list)
             print(f"Updated exam schedule from summary with {len(merged_schedule_list)} dates")
-        # If no unavailability file, read from summary columns
+        # If no unavailability file, use the summary columns
         new_unavailability = {}
         if not (unavailability_file and unavailability_file.filename.endswith('.xlsx')):
-            for _, row in summary_df.iterrows():
-                faculty = row['Faculty']
-                if faculty not in new_unavailability:
-                    new_unavailability[faculty] = {'first_half': [], 'second_half': []}
-                # First Half Unavailable
-                fh_unavail = str(row.get('First Half Unavailable', ''))
-                if fh_unavail and fh_unavail != 'None' and fh_unavail != 'nan':
-                    fh_dates = [d.strip() for d in fh_unavail.split(',') if d.strip()]
-                    for date_str in fh_dates:
-                        try:
-                            date_obj = datetime.datetime.strptime(date_str, '%d-%m-%Y').date()
-                            date_key = date_obj.strftime('%Y-%m-%d')
-                            if date_key not in new_unavailability[faculty]['first_half']:
-                                new_unavailability[faculty]['first_half'].append(date_key)
-                        except ValueError:
-                            print(f"Warning: Could not parse unavailable first half date '{date_str}' for faculty {faculty}")
-                # Second Half Unavailable
-                sh_unavail = str(row.get('Second Half Unavailable', ''))
-                if sh_unavail and sh_unavail != 'None' and sh_unavail != 'nan':
-                    sh_dates = [d.strip() for d in sh_unavail.split(',') if d.strip()]
-                    for date_str in sh_dates:
-                        try:
-                            date_obj = datetime.datetime.strptime(date_str, '%d-%m-%Y').date()
-                            date_key = date_obj.strftime('%Y-%m-%d')
-                            if date_key not in new_unavailability[faculty]['second_half']:
-                                new_unavailability[faculty]['second_half'].append(date_key)
-                        except ValueError:
-                            print(f"Warning: Could not parse unavailable second half date '{date_str}' for faculty {faculty}")
+            new_unavailability = summary_unavailability
             if new_unavailability:
-                with open(FACULTY_UNAVAILABILITY_PATH, "w", encoding="utf-8") as f:
-                    json.dump(new_unavailability, f, ensure_ascii=False)
+                save_json_store(FACULTY_UNAVAILABILITY_PATH, new_unavailability)
                 print(f"Updated faculty unavailability from summary for {len(new_unavailability)} faculty")
         
         # Save new assignments
-        with open(ASSIGNMENTS_PATH, "w", encoding="utf-8") as f:
-            json.dump(new_assignments, f, ensure_ascii=False)
+        save_json_store(ASSIGNMENTS_PATH, new_assignments)
         
         print(f"Generated {len(new_assignments)} assignments")
         
-        # Clean up temp files
-        os.remove(temp_summary_path)
-        
         schedule_message = f" and updated exam schedule with {len(merged_schedule_list)} dates" if merged_schedule_list else ""
         unavailability_message = f" and updated unavailability for {len(new_unavailability)} faculty" if new_unavailability else ""
         
@@ -1023,7 +3466,9 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
         
         return {
             "status": "ok",
-            "message": f"Regenerated {len(new_assignments)} assignments from summary{schedule_message}{unavailability_message}"
+            "message": f"Regenerated {len(new_assignments)} assignments from summary{schedule_message}{unavailability_message}",
+            "errors": row_errors,
+            "name_resolution": name_resolution_report(name_index, uploaded_names)
         }
         
     except Exception as e:
@@ -1031,15 +3476,14 @@ async def regenerate_from_summary(summary_file: UploadFile = File(...), schedule
         import traceback
         traceback.print_exc()
         
-        # Clean up any temp files that might exist
-        for temp_file in ["temp_summary.xlsx", "temp_schedule.xlsx", "temp_unavailability.xlsx"]:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
-        
         return JSONResponse(status_code=500, content={"error": f"Failed to regenerate assignments: {str(e)}"})
+    finally:
+        # Early returns and errors can leave a workbook unread; every opened upload is released here
+        for rows in (summary_rows, schedule_rows, unavailability_rows):
+            if rows is not None:
+                rows.close()
+
+startup_metrics["module_load_ms"] = elapsed_ms(_module_load_started)
 
 if __name__ == "__main__":
     import uvicorn